@@ -8,53 +8,922 @@
 #################################################### countries ###############################################
 ################# Skills Used: API, Pandas, Matplotlib/Seaborn, File Handling, Data Structures. ##############
 ##############################################################################################################
-import requests
+import os
+import codecs
+import glob
+import hashlib
+import json
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import date
+from email.utils import parsedate_to_datetime
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-import tkinter as tk
-from tkinter import messagebox
-import matplotlib.pyplot as plt
+import covid_telemetry as telemetry
+# requests, tkinter and matplotlib are imported inside the functions that use them,
+# so scripts that only read stored data (e.g. covid_dash.py query) start quickly without a display
 
 # Global variables
 df = None
+df_country = None  # Country whose data is in df
 filtered_data = None
 filter_type = None  # Tracks the type of filter applied (date_range, specific_date, year)
+rollup_cache = {}  # Precomputed prefix sums per country (see build_prefix_sums)
+sorted_date_buffers = weakref.WeakValueDictionary()  # Date arrays of frames returned in date order (see mark_sorted_by_date)
+date_key_cache = {}  # API date keys ("M/D/YY") -> day offsets from 1970-01-01, shared by all countries
+frame_cache = OrderedDict()  # Loaded country frames, least recently used first (see get_country_frame)
+frame_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+frame_cache_lock = threading.Lock()
+derived_cache = {}  # Derived daily metrics per country (see build_derived_metrics)
+snapshot = {"table": None, "aliases": {}, "loaded_at": 0.0}  # Latest totals of all countries (see load_snapshot)
+snapshot_lock = threading.Lock()
+replace_lock = threading.Lock()  # Serializes the folder swaps of replace_folder within the process
+shared_dataset = {"version": None}  # The shared dataset as opened by this process (see open_shared_dataset)
+chart = None  # Chart embedded in the dashboard window (see create_chart)
+
+# API settings (API_BASE_URL can point at a local stand-in server for testing)
+API_BASE_URL = "https://disease.sh/v3/covid-19"
+REQUEST_TIMEOUT = 15  # Seconds to wait for each HTTP request
+MAX_RETRIES = 3  # Extra attempts after a timeout, connection error, 429 or 5xx
+BACKOFF_FACTOR = 0.5  # Retry delays grow as 0.5s, 1s, 2s, ...
+HTTP_POOL_SIZE = 32  # Keep-alive connections shared by all fetches
+API_RATE_LIMIT = None  # Most API requests per second across all threads (None: no limit)
+HTTP_CACHE_DIR = "http_cache"  # Folder in DATA_DIR for cached API responses (None disables the cache)
+HTTP_CACHE_TTL_SECONDS = 3600  # How long a response without Cache-Control/Expires is used without asking again
+HTTP_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600  # Cached responses not written for this long are deleted
+HTTP_CACHE_MAX_ENTRIES = 256  # Most cached responses kept (the least recently written go first)
+STREAM_CHUNK_BYTES = 64 * 1024  # Bytes read at a time when streaming the all-countries payload
+
+# Incremental refresh settings
+FRESHNESS_TTL_HOURS = 24  # Stored data younger than this is not refreshed
+COUNTRY_TTL_HOURS = {}  # Per-country overrides, e.g. {"usa": 6}
+REFRESH_OVERLAP_DAYS = 3  # Re-download the last few stored days to pick up data revisions
+
+# Storage settings
+DATA_DIR = "."  # Folder holding the stored country data
+STORAGE_FORMAT = "npy"  # "npy" (binary, memory-mappable column files), "sqlite" (one database) or "csv"
+DATABASE_NAME = "covid_data.db"  # Consolidated store used by the "sqlite" format
+VERSIONS_DIR = ".versions"  # Folder in DATA_DIR holding the versions of the .npy folders (see replace_folder)
+STALE_VERSION_SECONDS = 3600  # Unused versions older than this were left behind by another process
+READ_ATTEMPTS = 5  # Reads of a .npy folder that is being replaced before giving up
+METRICS = ['cases', 'deaths', 'recovered', 'vaccinations']
+
+# GUI settings
+POLL_INTERVAL_MS = 16  # How often the Tk loop checks for finished background jobs (about one frame)
+SERIES_STYLES = [('cases', 'Cases', 'blue'), ('recovered', 'Recoveries', 'green'),
+                 ('deaths', 'Deaths', 'red'), ('vaccinations', 'Vaccinations', 'purple')]
+DERIVED_WINDOWS = (7, 14)  # Rolling average windows (days) for the daily new counts
+COUNTRY_POPULATIONS = {}  # Population of each country for per-capita comparisons, e.g. {"india": 1406631776}
+SNAPSHOT_TTL_SECONDS = 600  # How long the latest-totals snapshot of all countries is reused
+SNAPSHOT_FIELDS = ['cases', 'todayCases', 'deaths', 'todayDeaths', 'recovered', 'todayRecovered', 'active',
+                   'critical', 'tests', 'population', 'casesPerOneMillion', 'deathsPerOneMillion']
+FRAME_CACHE_BUDGET_BYTES = 256 * 1024 * 1024  # Memory the cache of loaded country frames may use
+SHARED_DATASET = False  # Serve country frames from the shared memory-mapped dataset (see export_shared_dataset)
+SHARED_DATASET_NAME = "covid_dataset"  # Folder in DATA_DIR holding the shared dataset
+
+http_session = None
+rate_limit_lock = threading.Lock()
+next_request_at = 0.0  # time.monotonic() at which the rate limit allows the next API request
+
+# Function to get the shared HTTP session (pooled keep-alive connections)
+def get_http_session():
+    global http_session
+    if http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        http_session.mount("http://", adapter)
+        http_session.mount("https://", adapter)
+    return http_session
+
+# Function to wait until the global API rate limit allows another request (spaced 1/API_RATE_LIMIT apart)
+def wait_for_rate_limit():
+    global next_request_at
+    if not API_RATE_LIMIT:
+        return
+    with rate_limit_lock:
+        now = time.monotonic()
+        start = max(now, next_request_at)
+        next_request_at = start + 1 / API_RATE_LIMIT
+    if start > now:
+        time.sleep(start - now)
+
+# Function to send a GET request with a timeout and exponential-backoff retry
+# (stream=True leaves the body unread so it can be consumed incrementally from response.raw)
+def get_with_retry(url, params=None, timeout=None, retries=None, stream=False, headers=None):
+    import requests
+    timeout = REQUEST_TIMEOUT if timeout is None else timeout
+    retries = MAX_RETRIES if retries is None else retries
+    session = get_http_session()
+
+    for attempt in range(retries + 1):
+        wait_for_rate_limit()
+        try:
+            response = session.get(url, params=params, timeout=timeout, stream=stream, headers=headers)
+            # Only rate limiting and server errors are worth retrying
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+
+        if attempt < retries:
+            time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+    return response
+
+# Function to get the cache files of a request: metadata (.json), raw body (.body) and the
+# normalized arrays of a timeline (.npz)
+def http_cache_paths(url, params=None):
+    key = hashlib.sha1(json.dumps([url, sorted((params or {}).items())], default=str).encode()).hexdigest()
+    base = os.path.join(DATA_DIR, HTTP_CACHE_DIR, key)
+    return base + ".json", base + ".body", base + ".npz"
+
+# Function to work out until when a response may be used without revalidation
+def response_expiry(headers, now):
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return now
+    max_age = re.search(r"max-age=(\d+)", cache_control)
+    if max_age:
+        return now + int(max_age.group(1))
+    if headers.get("Expires"):
+        try:
+            return parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return now
+    return now + HTTP_CACHE_TTL_SECONDS
+
+# Function to write a file atomically (a temporary file renamed over the target)
+def write_file_atomic(path, data):
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+# Function to delete old entries from the response cache: those not written for
+# HTTP_CACHE_MAX_AGE_SECONDS and, beyond HTTP_CACHE_MAX_ENTRIES, the least recently written ones.
+# Incremental refreshes ask for a different number of days each time, so their responses never
+# hit again and would otherwise pile up.
+def prune_http_cache(now=None):
+    folder = os.path.join(DATA_DIR, HTTP_CACHE_DIR)
+    now = time.time() if now is None else now
+    written = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            key, extension = os.path.splitext(entry.name)
+            if extension == ".json":
+                written[key] = entry.stat().st_mtime
+    newest_first = sorted(written, key=written.get, reverse=True)
+    expired = [key for key in newest_first[:HTTP_CACHE_MAX_ENTRIES] if now - written[key] > HTTP_CACHE_MAX_AGE_SECONDS]
+    for key in newest_first[HTTP_CACHE_MAX_ENTRIES:] + expired:
+        # The metadata goes first, so a half-deleted entry is never used
+        for extension in (".json", ".body", ".npz"):
+            try:
+                os.remove(os.path.join(folder, key + extension))
+            except FileNotFoundError:
+                pass
+    return len(written) - len(newest_first[HTTP_CACHE_MAX_ENTRIES:]) - len(expired)
+
+# Function to GET a URL through the on-disk response cache.
+# Fresh entries are used without any request, expired ones are revalidated with If-None-Match /
+# If-Modified-Since, and the stored body is served (stale) when the network or server fails.
+# Returns (body, status) with status "hit", "revalidated", "stale" or "miss" (raises on failure).
+@telemetry.instrument("http_get", lambda result, *args, **kwargs: {
+    "bytes": len(result[0]) if result[1] == "miss" else 0,
+    "cache_hits": result[1] != "miss", "cache_misses": result[1] == "miss"})
+def cached_get(url, params=None, timeout=None, retries=None):
+    import requests
+    if not HTTP_CACHE_DIR:
+        response = get_with_retry(url, params=params, timeout=timeout, retries=retries)
+        response.raise_for_status()
+        return response.content, "miss"
+
+    meta_path, body_path, normalized_path = http_cache_paths(url, params)
+    entry = None
+    if os.path.exists(meta_path) and os.path.exists(body_path):
+        with open(meta_path) as meta_file:
+            entry = json.load(meta_file)
+    now = time.time()
+    if entry is not None and now < entry["expires"]:
+        with open(body_path, "rb") as body_file:
+            return body_file.read(), "hit"
+
+    headers = {}
+    if entry is not None and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry is not None and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    try:
+        response = get_with_retry(url, params=params, timeout=timeout, retries=retries, headers=headers)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if entry is None:
+            raise
+        print(f"Using cached response for {url} ({e})")
+        with open(body_path, "rb") as body_file:
+            return body_file.read(), "stale"
+
+    if response.status_code == 304 and entry is not None:
+        entry["expires"] = response_expiry(response.headers, now)
+        write_file_atomic(meta_path, json.dumps(entry).encode())
+        with open(body_path, "rb") as body_file:
+            return body_file.read(), "revalidated"
+
+    response.raise_for_status()
+    # The metadata is written last: an entry only counts once its body is complete
+    os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+    if os.path.exists(normalized_path):
+        os.remove(normalized_path)
+    write_file_atomic(body_path, response.content)
+    entry = {"url": url, "params": params, "etag": response.headers.get("ETag"),
+             "last_modified": response.headers.get("Last-Modified"),
+             "expires": response_expiry(response.headers, now), "stored_at": now}
+    write_file_atomic(meta_path, json.dumps(entry, default=str).encode())
+    prune_http_cache(now)
+    return response.content, "miss"
+
+# Function to download the historical timeline of one country (raises on failure)
+def request_country_timeline(country, lastdays="all", timeout=None, retries=None):
+    url = f"{API_BASE_URL}/historical/{country}"
+    body, _ = cached_get(url, params={"lastdays": lastdays}, timeout=timeout, retries=retries)
+    return json.loads(body)['timeline']
+
+# Function to download the historical data of one country as a normalized frame (raises on failure).
+# A cached response keeps its normalized arrays next to it, so a cache hit skips the JSON parsing too.
+@telemetry.instrument("fetch", telemetry.count_rows)
+def request_country_frame(country, lastdays="all", timeout=None, retries=None):
+    url = f"{API_BASE_URL}/historical/{country}"
+    params = {"lastdays": lastdays}
+    body, status = cached_get(url, params=params, timeout=timeout, retries=retries)
+    normalized_path = http_cache_paths(url, params)[2] if HTTP_CACHE_DIR else None
+    if status != "miss" and normalized_path and os.path.exists(normalized_path):
+        with np.load(normalized_path) as arrays:
+            return apply_schema(pd.DataFrame({'date': arrays['date'].astype('datetime64[D]'),
+                                              **{metric: arrays[metric] for metric in METRICS}}))
+
+    days, values = timeline_to_arrays(json.loads(body)['timeline'])
+    if normalized_path:
+        temporary = f"{normalized_path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(temporary, date=days, **values)
+        os.replace(temporary, normalized_path)
+    return apply_schema(pd.DataFrame({'date': days.astype('datetime64[D]'), **values}))
 
 # Function to fetch COVID-19 data from API for a specific country
-def fetch_country_data(country):
-    url = f"https://disease.sh/v3/covid-19/historical/{country}?lastdays=all"
-    response = requests.get(url)
-    
-    if response.status_code == 200:
-        data = response.json()
-        return data['timeline']
-    else:
-        print(f"Error fetching data for {country}. Status code: {response.status_code}")
+# (lastdays can be a number of days to download only the most recent window)
+def fetch_country_data(country, lastdays="all"):
+    import requests
+    try:
+        return request_country_timeline(country, lastdays=lastdays)
+    except requests.HTTPError as e:
+        print(f"Error fetching data for {country}. Status code: {e.response.status_code}")
+        return None
+    except requests.RequestException as e:
+        print(f"Error fetching data for {country}: {e}")
+        return None
+
+# Function to fetch the data of a country as a normalized frame (None if the download failed)
+def fetch_country_frame(country, lastdays="all"):
+    import requests
+    try:
+        return request_country_frame(country, lastdays=lastdays)
+    except requests.HTTPError as e:
+        print(f"Error fetching data for {country}. Status code: {e.response.status_code}")
         return None
+    except (requests.RequestException, KeyError, ValueError) as e:
+        print(f"Error fetching data for {country}: {e}")
+        return None
+
+# Function to fetch many countries at once with a bounded pool of worker threads.
+# Returns a report {country: {"timeline": ..., "error": ..., "seconds": ...}}
+# where exactly one of "timeline" and "error" is set for each country.
+def fetch_countries(countries, max_concurrency=8, timeout=None, retries=None):
+    import requests
+
+    def fetch_one(country):
+        start = time.perf_counter()
+        try:
+            timeline = request_country_timeline(country, timeout=timeout, retries=retries)
+            return {"timeline": timeline, "error": None, "seconds": time.perf_counter() - start}
+        except (requests.RequestException, KeyError, ValueError) as e:
+            return {"timeline": None, "error": str(e), "seconds": time.perf_counter() - start}
+
+    report = {}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = {executor.submit(fetch_one, country): country for country in countries}
+        for future in as_completed(futures):
+            report[futures[future]] = future.result()
+    return report
+
+# Function to iterate over the elements of a JSON array read incrementally from a binary stream.
+# Only the current element and the unread part of the last chunk are held in memory.
+def iter_json_array(stream, chunk_size=None):
+    chunk_size = chunk_size or STREAM_CHUNK_BYTES
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    in_array = False
+    end_of_stream = False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,")
+        if not in_array and buffer:
+            if buffer[0] != "[":
+                raise ValueError("Expected a JSON array")
+            buffer = buffer[1:]
+            in_array = True
+            continue
+        if in_array and buffer.startswith("]"):
+            return
+        if in_array and buffer:
+            try:
+                element, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if end_of_stream:
+                    raise
+            else:
+                # An element ending exactly at the end of the buffer may still continue (e.g. a number)
+                if end < len(buffer) or end_of_stream:
+                    yield element
+                    buffer = buffer[end:]
+                    continue
+        if end_of_stream:
+            raise ValueError("Unexpected end of JSON array")
+
+        # Read at least as much as is buffered, so a large element is not re-parsed too often
+        chunk = stream.read(max(chunk_size, len(buffer)))
+        if not chunk:
+            end_of_stream = True
+        buffer += text.decode(chunk, final=not chunk)
+
+# Function to add up several frames of the same country (e.g. its provinces) day by day
+def sum_country_frames(frames):
+    if len(frames) == 1:
+        return frames[0]
+    combined = pd.concat(frames, ignore_index=True)
+    return apply_schema(combined.groupby('date', sort=True).sum(min_count=1).reset_index())
+
+# Function to stream the historical data of all countries from the API (one request for every
+# country), another URL such as a stand-in server, or a local JSON file with the same payload.
+# Yields (country, frame) one country at a time; provinces of a country are added up.
+def iter_all_countries(source=None, lastdays="all"):
+    if source is None or source.startswith(("http://", "https://")):
+        url = source or f"{API_BASE_URL}/historical"
+        response = get_with_retry(url, params=None if source else {"lastdays": lastdays}, stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True  # Let urllib3 undo any gzip transfer encoding
+        stream = response
+        body = response.raw
+    else:
+        stream = body = open(source, "rb")
+
+    with closing(stream):
+        country = None
+        frames = []
+        for entry in iter_json_array(body):
+            name = entry['country'].strip().lower()
+            if name != country and frames:
+                yield country, sum_country_frames(frames)
+                frames = []
+            country = name
+            frames.append(timeline_to_frame(entry['timeline']))
+        if frames:
+            yield country, sum_country_frames(frames)
+
+# Function to download the historical data of every country in one streamed request and write
+# each country to storage as soon as it has arrived, so only one country is in memory at a time.
+# Returns {country: number of stored days}.
+@telemetry.instrument("ingest", lambda report, *args, **kwargs: {"rows": sum(report.values())})
+def ingest_all_countries(source=None, lastdays="all"):
+    report = {}
+    for country, frame in iter_all_countries(source, lastdays):
+        if country in report:
+            # The provinces of a country were not next to each other in the payload
+            frame = sum_country_frames([read_country_frame(country, mmap=False), frame])
+        write_country_frame(country, frame)
+        report[country] = len(frame)
+    return report
+
+# Function to convert API date keys ("M/D/YY") into day offsets from 1970-01-01.
+# Every key is parsed only once per process; all countries share the same keys.
+def date_keys_to_days(keys):
+    for key in keys:
+        if key not in date_key_cache:
+            month, day, year = key.split("/")
+            date_key_cache[key] = (date(2000 + int(year), int(month), int(day)) - date(1970, 1, 1)).days
+    return np.fromiter(map(date_key_cache.__getitem__, keys), dtype=np.int64, count=len(keys))
+
+# Function to convert an API timeline straight into aligned NumPy arrays.
+# Returns (days, {metric: float values with NaN for missing days}) sorted by day.
+def timeline_to_arrays(data):
+    series = {'cases': data['cases'], 'deaths': data['deaths'], 'recovered': data['recovered'],
+              'vaccinations': data.get('vaccinated', {})}  # Vaccination data is often missing
+    keys = list(data['cases'])
+    days = date_keys_to_days(keys)
+    values = {}
+    for metric, timeline in series.items():
+        if list(timeline) == keys:
+            # The usual case: the same dates in the same order as the cases
+            values[metric] = np.fromiter(timeline.values(), dtype=np.float64, count=len(keys))
+        else:
+            values[metric] = None
+
+    # Series with other dates are aligned on the union of all dates
+    unaligned = [metric for metric, metric_values in values.items() if metric_values is None]
+    if unaligned:
+        all_days = np.unique(np.concatenate([days] + [date_keys_to_days(list(series[m])) for m in unaligned]))
+        positions = all_days.searchsorted(days)
+        for metric in METRICS:
+            aligned = np.full(len(all_days), np.nan)
+            if values[metric] is not None:
+                aligned[positions] = values[metric]
+            elif series[metric]:
+                timeline = series[metric]
+                aligned[all_days.searchsorted(date_keys_to_days(list(timeline)))] = list(timeline.values())
+            values[metric] = aligned
+        days = all_days
+
+    order = np.argsort(days, kind='stable')
+    if not (order == np.arange(len(order))).all():
+        days = days[order]
+        values = {metric: metric_values[order] for metric, metric_values in values.items()}
+    return days, values
+
+# Function to convert an API timeline into a DataFrame (date, cases, deaths, recovered, vaccinations)
+@telemetry.instrument("parse", telemetry.count_rows)
+def timeline_to_frame(data):
+    days, values = timeline_to_arrays(data)
+    return apply_schema(pd.DataFrame({'date': days.astype('datetime64[D]'), **values}))
+
+# Function to pick the smallest unsigned integer type for a counter column (NaN marks missing days).
+# The largest value of the type is kept free so it can mark missing days on disk.
+def compact_counter_dtype(values):
+    valid = values[~np.isnan(values)]
+    if len(valid) and valid.min() < 0:
+        return np.dtype(np.int64)
+    top = valid.max() if len(valid) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if top < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+# Function to get a counter column as floats with NaN for missing days (for plotting and maths)
+def metric_values(df, column):
+    return df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+# Function to convert a counter column to its compact type: a plain NumPy unsigned array when
+# no day is missing, otherwise a pandas nullable array (UInt8, UInt16, ...) that keeps the gaps
+def compact_counter(series):
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    missing = np.isnan(values)
+    dtype = compact_counter_dtype(values)
+    if not missing.any():
+        return values.astype(dtype)
+    return pd.arrays.IntegerArray(np.where(missing, 0, values).astype(dtype), missing)
+
+# Function to apply the compact schema to a country frame:
+# date as datetime64[s] and every counter as the smallest safe (nullable) unsigned integer type
+def apply_schema(df):
+    columns = {'date': df['date'].to_numpy(dtype='datetime64[s]')}
+    for column in METRICS:
+        columns[column] = compact_counter(df[column])
+    return mark_sorted_by_date(pd.DataFrame(columns))
+
+# Function to report the memory used by the loaded frame of each country (all stored ones by default)
+def memory_report(countries=None):
+    rows = []
+    for country in (list_stored_countries() if countries is None else countries):
+        country_df = get_country_frame(country)
+        if country_df is None:
+            continue
+        size = int(country_df.memory_usage(index=True, deep=True).sum())
+        rows.append({"country": country, "rows": len(country_df), "bytes": size,
+                     "bytes_per_row": round(size / max(len(country_df), 1), 1),
+                     "dtypes": ", ".join(f"{column}={country_df[column].dtype}" for column in METRICS)})
+    return pd.DataFrame(rows, columns=["country", "rows", "bytes", "bytes_per_row", "dtypes"])
 
 # Function to process the data and save it to a CSV file
 def save_data_to_csv(country, data):
-    cases = pd.DataFrame.from_dict(data['cases'], orient='index', columns=['cases'])
-    deaths = pd.DataFrame.from_dict(data['deaths'], orient='index', columns=['deaths'])
-    recovered = pd.DataFrame.from_dict(data['recovered'], orient='index', columns=['recovered'])
+    df = timeline_to_frame(data)
 
-    # Check if 'vaccinated' data exists, if not, set to None
-    vaccinations = pd.DataFrame.from_dict(data.get('vaccinated', {}), orient='index', columns=['vaccinations'])
-    
-    # If vaccination data is not available, fill with 0 or forward fill
-    if vaccinations.empty:
-        vaccinations = pd.DataFrame(index=cases.index, columns=['vaccinations'])
-        vaccinations['vaccinations'] = 0  # Filling with 0, or use .ffill() for forward fill
-
-    # Merge the dataframes
-    df = pd.concat([cases, deaths, recovered, vaccinations], axis=1)
-    df.index = pd.to_datetime(df.index)
-    df = df.reset_index().rename(columns={"index": "date"})
-    
     # Save the dataframe to a CSV file
     file_name = f"{country}_covid_data.csv"
     df.to_csv(file_name, index=False)
     print(f"Data for {country} has been saved to {file_name}.")
 
+# Function to get the storage path of a country ("npy" is a folder with one .npy file per column,
+# "sqlite" is the single database shared by all countries)
+def country_data_path(country, storage_format=None):
+    storage_format = storage_format or STORAGE_FORMAT
+    if storage_format == "npy":
+        return os.path.join(DATA_DIR, f"{country}_covid_data")
+    if storage_format == "csv":
+        return os.path.join(DATA_DIR, f"{country}_covid_data.csv")
+    if storage_format == "sqlite":
+        return os.path.join(DATA_DIR, DATABASE_NAME)
+    raise ValueError(f"Unknown storage format: {storage_format}")
+
+# Function to open the consolidated database, creating its tables on first use.
+# covid_data is clustered on (country, day), so any country/date query is one index range scan.
+def open_database():
+    connection = sqlite3.connect(country_data_path(None, "sqlite"))
+    connection.execute("""CREATE TABLE IF NOT EXISTS covid_data (
+        country TEXT NOT NULL, day INTEGER NOT NULL,
+        cases INTEGER, deaths INTEGER, recovered INTEGER, vaccinations INTEGER,
+        PRIMARY KEY (country, day)) WITHOUT ROWID""")
+    connection.execute("CREATE TABLE IF NOT EXISTS countries (country TEXT PRIMARY KEY, updated_at REAL NOT NULL)")
+    return connection
+
+# Function to convert a date into a day offset from 1970-01-01 (the stored date format)
+def day_number(date):
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+# Function to write a country DataFrame to storage
+@telemetry.instrument("write", telemetry.count_input_rows)
+def write_country_frame(country, df, storage_format=None):
+    storage_format = storage_format or STORAGE_FORMAT
+    rollup_cache.pop(country, None)  # Rebuilt on the next load
+    invalidate_country_frame(country)
+    derived_cache.pop(country, None)
+    path = country_data_path(country, storage_format)
+    if storage_format == "csv":
+        temporary = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        df.to_csv(temporary, index=False)
+        os.replace(temporary, path)
+        return path
+
+    # Dates are stored as day offsets from 1970-01-01, counters as compact integers (missing days as NULL
+    # in the database, and as the largest value of the column type in .npy files)
+    days = df['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+    if storage_format == "sqlite":
+        counters = [[None if value is pd.NA else int(value) for value in df[column].astype("Int64").tolist()]
+                    for column in METRICS]
+        rows = zip([country] * len(days), days.tolist(), *counters)
+        with closing(open_database()) as connection, connection:
+            connection.execute("DELETE FROM covid_data WHERE country = ?", (country,))
+            connection.executemany("INSERT INTO covid_data VALUES (?, ?, ?, ?, ?, ?)", rows)
+            connection.execute("INSERT OR REPLACE INTO countries VALUES (?, ?)", (country, time.time()))
+        return path
+
+    # The files are written to a new version folder that then replaces the stored one,
+    # so readers never see a mix of old and new columns
+    temporary = new_version_folder(path)
+    try:
+        np.save(os.path.join(temporary, "date.npy"), days.astype(np.int32))
+        schema = {"date": "int32 days since 1970-01-01", "columns": {}}
+        for column in METRICS:
+            values = metric_values(df, column)
+            missing = np.isnan(values)
+            dtype = compact_counter_dtype(values)
+            stored = np.where(missing, np.iinfo(dtype).max, values).astype(dtype)
+            np.save(os.path.join(temporary, f"{column}.npy"), stored)
+            schema["columns"][column] = {"dtype": dtype.name, "nullable": bool(missing.any())}
+        with open(os.path.join(temporary, "schema.json"), "w") as schema_file:
+            json.dump(schema, schema_file)
+
+        # Precompute the rollups at ingest time so loading never has to rebuild them
+        np.save(os.path.join(temporary, "prefix_sums.npy"), build_prefix_sums(df))
+    except BaseException:
+        shutil.rmtree(temporary, ignore_errors=True)
+        raise
+    replace_folder(temporary, path)
+    return path
+
+# Function to create an empty version folder for the folder at path. Versions are kept in
+# VERSIONS_DIR next to it, so globs over DATA_DIR (e.g. build_database) only see the published names.
+def new_version_folder(path):
+    version = os.path.join(os.path.dirname(path), VERSIONS_DIR,
+                           f"{os.path.basename(path)}.v{time.time_ns()}-{os.getpid()}-{threading.get_ident()}")
+    os.makedirs(version)
+    return version
+
+# Function to publish a new version folder at target. Where symlinks are available, target is a
+# link to the current version and is swapped in a single atomic rename. Otherwise (and once for a
+# folder written by older versions) the old folder is moved aside first, because a folder cannot
+# be renamed over a non-empty one; readers wait for the swap to finish (see wait_for_replace).
+# Replaced versions are deleted; memory-mapped files in them stay readable until they are closed.
+def replace_folder(source, target):
+    versions = os.path.dirname(source)
+    name = os.path.basename(target)
+    # Without the lock two threads could both delete the same replaced version and leave one behind
+    with replace_lock:
+        old = None
+        aside = os.path.join(versions, f"{name}.old-{os.getpid()}-{threading.get_ident()}")
+        if os.path.isdir(target) and not os.path.islink(target):
+            os.rename(target, aside)
+            old = aside
+        elif os.path.islink(target):
+            old = os.path.realpath(target)
+
+        link = os.path.join(versions, f"{name}.link-{os.getpid()}-{threading.get_ident()}")
+        try:
+            os.symlink(os.path.join(os.path.basename(versions), os.path.basename(source)), link,
+                       target_is_directory=True)
+            os.replace(link, target)
+        except (OSError, NotImplementedError):
+            if os.path.lexists(link):
+                os.remove(link)
+            if os.path.islink(target):
+                os.rename(target, aside)  # Moved aside like a folder, so readers know to wait
+            os.rename(source, target)
+            if os.path.islink(aside):
+                os.remove(aside)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        remove_stale_versions(target)
+
+# Function to delete the versions of the folder at target that were left behind by other processes
+# (replaced or half-written versions older than STALE_VERSION_SECONDS)
+def remove_stale_versions(target):
+    current = os.path.realpath(target)
+    now = time.time()
+    for version in glob.glob(os.path.join(os.path.dirname(target), VERSIONS_DIR, f"{glob.escape(os.path.basename(target))}.*")):
+        try:
+            if os.path.realpath(version) != current and now - os.path.getmtime(version) > STALE_VERSION_SECONDS:
+                shutil.rmtree(version, ignore_errors=True)
+        except OSError:
+            pass
+
+# Function to wait while another thread or process swaps the folder at path without symlinks (the
+# folder is missing between its two renames). Returns whether the folder exists.
+def wait_for_replace(path, timeout=1.0):
+    moved_aside = os.path.join(os.path.dirname(path), VERSIONS_DIR, f"{glob.escape(os.path.basename(path))}.old-*")
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if not glob.glob(moved_aside) or time.monotonic() > deadline:
+            return os.path.exists(path)
+        time.sleep(0.005)
+    return True
+
+# Function to read a country DataFrame from storage (None if nothing is stored).
+# Binary column files are memory-mapped, so loading does no parsing at all.
+@telemetry.instrument("read", telemetry.count_rows)
+def read_country_frame(country, storage_format=None, mmap=True):
+    storage_format = storage_format or STORAGE_FORMAT
+    if storage_format != "csv" and not country_data_stored(country, storage_format):
+        # Automatic migration of data saved by older versions as CSV
+        if not migrate_csv_file(country):
+            return None
+
+    path = country_data_path(country, storage_format)
+    if storage_format == "csv":
+        if not os.path.exists(path):
+            return None
+        df = pd.read_csv(path)
+        df['date'] = pd.to_datetime(df['date'])
+        df = apply_schema(df.sort_values('date', ignore_index=True))
+        prefix = None
+    elif storage_format == "sqlite":
+        df = apply_schema(query([country]).drop(columns='country'))
+        prefix = None
+    else:
+        # A writer may swap in a new folder while the files are read. The files are read from the
+        # version the link points to, and the read is repeated if that version was deleted or (without
+        # symlinks) the folder was replaced underneath it, so the columns always come from one version
+        for attempt in range(READ_ATTEMPTS):
+            try:
+                wait_for_replace(path)
+                folder = os.path.realpath(path)
+                version = os.stat(folder).st_ino
+                df, prefix = read_npy_folder(folder, 'r' if mmap else None)
+                if os.stat(folder).st_ino == version:
+                    break
+            except (OSError, ValueError):
+                if attempt == READ_ATTEMPTS - 1:
+                    raise
+        else:
+            raise OSError(f"{path} was replaced during every read attempt")
+
+    register_rollups(country, df, prefix)
+    return mark_sorted_by_date(df)
+
+# Function to read the column files of a country folder. Returns (df, prefix sums or None).
+def read_npy_folder(path, mmap_mode):
+    schema_path = os.path.join(path, "schema.json")
+    schema = {"columns": {}}
+    if os.path.exists(schema_path):
+        with open(schema_path) as schema_file:
+            schema = json.load(schema_file)
+    days = np.load(os.path.join(path, "date.npy"), mmap_mode=mmap_mode)
+    columns = {'date': days.astype('datetime64[D]')}
+    for column in METRICS:
+        values = np.load(os.path.join(path, f"{column}.npy"), mmap_mode=mmap_mode)
+        if schema["columns"].get(column, {}).get("nullable"):
+            values = pd.arrays.IntegerArray(np.asarray(values), values == np.iinfo(values.dtype).max)
+        columns[column] = values
+    df = pd.DataFrame(columns, copy=False)
+    if not os.path.exists(schema_path):
+        df = apply_schema(df)  # Folder written before the compact schema existed
+    prefix_path = os.path.join(path, "prefix_sums.npy")
+    prefix = np.load(prefix_path, mmap_mode=mmap_mode) if os.path.exists(prefix_path) else None
+    return df, prefix
+
+# Function to check whether data for a country is stored in the given format
+def country_data_stored(country, storage_format=None):
+    storage_format = storage_format or STORAGE_FORMAT
+    path = country_data_path(country, storage_format)
+    if storage_format == "npy":
+        return os.path.exists(path) or wait_for_replace(path)
+    if storage_format != "sqlite" or not os.path.exists(path):
+        return os.path.exists(path)
+    with closing(open_database()) as connection:
+        return connection.execute("SELECT 1 FROM countries WHERE country = ?", (country,)).fetchone() is not None
+
+# Function to check whether any data (in the storage format or as an old CSV) is stored for a country
+def country_data_exists(country):
+    return country_data_stored(country) or country_data_stored(country, "csv")
+
+# Function to get the time the stored data of a country was last written
+def country_data_mtime(country):
+    if STORAGE_FORMAT == "sqlite" and country_data_stored(country):
+        with closing(open_database()) as connection:
+            return connection.execute("SELECT updated_at FROM countries WHERE country = ?", (country,)).fetchone()[0]
+
+    path = country_data_path(country)
+    if os.path.isdir(path):
+        path = os.path.join(path, "date.npy")
+    elif not os.path.exists(path):
+        path = country_data_path(country, "csv")
+    return os.path.getmtime(path)
+
+# Function to convert an existing {country}_covid_data.csv file to the storage format
+def migrate_csv_file(country):
+    csv_path = country_data_path(country, "csv")
+    if STORAGE_FORMAT == "csv" or not os.path.exists(csv_path):
+        return False
+    write_country_frame(country, read_country_frame(country, "csv"))
+    print(f"Data for {country} has been migrated from {csv_path}.")
+    return True
+
+# Function to convert every *_covid_data.csv file in DATA_DIR to the storage format
+def migrate_csv_files():
+    migrated = []
+    for csv_path in glob.glob(os.path.join(DATA_DIR, "*_covid_data.csv")):
+        country = os.path.basename(csv_path)[:-len("_covid_data.csv")]
+        if not country_data_stored(country) and migrate_csv_file(country):
+            migrated.append(country)
+    return migrated
+
+# Function to copy every country stored as .npy folders or CSV files into the consolidated database
+def build_database():
+    imported = []
+    paths = glob.glob(os.path.join(DATA_DIR, "*_covid_data")) + glob.glob(os.path.join(DATA_DIR, "*_covid_data.csv"))
+    for path in sorted(paths):
+        name = os.path.basename(path)
+        storage_format = "csv" if name.endswith(".csv") else "npy"
+        country = name[:-len("_covid_data.csv")] if storage_format == "csv" else name[:-len("_covid_data")]
+        if country in imported or (storage_format == "npy" and not os.path.isdir(path)):
+            continue
+        write_country_frame(country, read_country_frame(country, storage_format, mmap=False), "sqlite")
+        imported.append(country)
+    return imported
+
+# Function to query several countries at once.
+# Returns one DataFrame (country, date, metrics...) sorted by country and date;
+# start/end are inclusive and may be None for an open-ended range.
+@telemetry.instrument("query", telemetry.count_rows)
+def query(countries, start=None, end=None, metrics=None):
+    if isinstance(countries, str):
+        countries = [countries]
+    metrics = list(metrics or METRICS)
+    unknown = set(metrics) - set(METRICS)
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+    start_day = day_number(start) if start is not None else np.iinfo(np.int64).min
+    end_day = day_number(end) if end is not None else np.iinfo(np.int64).max
+
+    if STORAGE_FORMAT == "sqlite":
+        placeholders = ", ".join("?" * len(countries))
+        sql = (f"SELECT country, day AS date, {', '.join(metrics)} FROM covid_data "
+               f"WHERE country IN ({placeholders}) AND day BETWEEN ? AND ? ORDER BY country, day")
+        with closing(open_database()) as connection:
+            result = pd.read_sql_query(sql, connection, params=[*countries, int(start_day), int(end_day)])
+        result['date'] = result['date'].to_numpy(dtype=np.int64).astype('datetime64[D]')
+        # Same column types as the file based formats (compact counters with <NA> for missing days)
+        for metric in metrics:
+            result[metric] = compact_counter(result[metric])
+        return result
+
+    # File based formats have to load each country separately
+    frames = []
+    for country in sorted(set(countries)):
+        country_df = read_country_frame(country)
+        if country_df is None:
+            continue
+        days = country_df['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+        country_df = country_df.loc[(days >= start_day) & (days <= end_day), ['date'] + metrics]
+        frames.append(country_df.assign(country=country)[['country', 'date'] + metrics])
+    if not frames:
+        return pd.DataFrame(columns=['country', 'date'] + metrics)
+    return pd.concat(frames, ignore_index=True)
+
+# Function to export the stored data of a country as a CSV file
+def export_country_csv(country, file_name=None):
+    df = read_country_frame(country)
+    if df is None:
+        return None
+    file_name = file_name or country_data_path(country, "csv")
+    df.to_csv(file_name, index=False)
+    return file_name
+
+# Function to process the data and save it to storage
+def save_country_data(country, data):
+    path = write_country_frame(country, timeline_to_frame(data))
+    print(f"Data for {country} has been saved to {path}.")
+
+# Function to get the loaded frame of a country from the in-memory LRU cache.
+# Cached frames are reused while the stored data keeps the same modification time; the least
+# recently used frames are evicted when the cache grows past FRAME_CACHE_BUDGET_BYTES.
+# With SHARED_DATASET set, frames come from the shared dataset while it is up to date.
+# Returns None if nothing is stored for the country.
+def get_country_frame(country):
+    if SHARED_DATASET:
+        df = shared_country_frame(country)
+        if df is not None:
+            return df
+    if not country_data_exists(country):
+        return None
+    mtime = country_data_mtime(country)
+    with frame_cache_lock:
+        cached = frame_cache.get(country)
+        if cached is not None and cached["mtime"] == mtime:
+            frame_cache.move_to_end(country)
+            frame_cache_stats["hits"] += 1
+            telemetry.record("frame_cache", cache_hits=1)
+            return cached["df"]
+        frame_cache_stats["misses"] += 1
+    telemetry.record("frame_cache", cache_misses=1)
+
+    df = read_country_frame(country)
+    if df is None:
+        return None
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    with frame_cache_lock:
+        old = frame_cache.pop(country, None)
+        if old is not None:
+            frame_cache_stats["bytes"] -= old["bytes"]
+        frame_cache[country] = {"df": df, "mtime": mtime, "bytes": size}
+        frame_cache_stats["bytes"] += size
+        while frame_cache_stats["bytes"] > FRAME_CACHE_BUDGET_BYTES and len(frame_cache) > 1:
+            _, evicted = frame_cache.popitem(last=False)
+            frame_cache_stats["bytes"] -= evicted["bytes"]
+            frame_cache_stats["evictions"] += 1
+    return df
+
+# Function to drop a country from the frame cache (called whenever its stored data is rewritten)
+def invalidate_country_frame(country):
+    with frame_cache_lock:
+        old = frame_cache.pop(country, None)
+        if old is not None:
+            frame_cache_stats["bytes"] -= old["bytes"]
+
+# Function to check whether the stored data of a country is younger than its TTL
+def is_data_fresh(country, now=None):
+    if not country_data_exists(country):
+        return False
+    now = time.time() if now is None else now
+    ttl_hours = COUNTRY_TTL_HOURS.get(country, FRESHNESS_TTL_HOURS)
+    return now - country_data_mtime(country) < ttl_hours * 3600
+
+# Function to bring the stored data of a country up to date.
+# Only the days after the last stored date are downloaded (lastdays=K) and merged in.
+# Returns "fresh", "updated" or "created", or None if the download failed.
+def update_country_data(country, force=False):
+    if not country_data_exists(country):
+        frame = fetch_country_frame(country)
+        if frame is None or frame.empty:
+            return None
+        path = write_country_frame(country, frame)
+        print(f"Data for {country} has been saved to {path}.")
+        return "created"
+
+    if not force and is_data_fresh(country):
+        return "fresh"
+
+    stored = read_country_frame(country, mmap=False)
+    last_date = stored['date'].max()
+    missing_days = (pd.Timestamp.now().normalize() - last_date).days
+    new_rows = fetch_country_frame(country, lastdays=max(missing_days, 0) + REFRESH_OVERLAP_DAYS)
+    if new_rows is None:
+        return None
+
+    # New rows replace the overlapping stored days, older rows are kept as they are
+    if not new_rows.empty:
+        stored = stored[stored['date'] < new_rows['date'].min()]
+        stored = pd.concat([stored, new_rows], ignore_index=True)
+    write_country_frame(country, stored)
+    print(f"Data for {country} has been updated with {len(new_rows)} recent days.")
+    return "updated"
+
 # Function to load COVID-19 data from a CSV file for a specific country
 def load_country_data_from_csv(country):
     global df
@@ -65,48 +934,697 @@ def load_country_data_from_csv(country):
         print(f"Data for {country} loaded from CSV.")
         return df
     except FileNotFoundError:
-        messagebox.showerror("Error", f"CSV file for {country} not found.")
+        show_message("error", "Error", f"CSV file for {country} not found.")
         return None
 
+# Function to load COVID-19 data from storage for a specific country
+def load_country_data(country):
+    global df
+    df = read_country_frame(country)
+    if df is None:
+        show_message("error", "Error", f"No stored data for {country} found.")
+        return None
+    print(f"Data for {country} loaded from storage.")
+    return df
+
+# Function to get the array that holds the dates of a frame (the one its date column is a view of)
+def date_buffer(dates):
+    while isinstance(dates.base, np.ndarray):
+        dates = dates.base
+    return dates
+
+# Function to mark a DataFrame whose rows are in date order (called by the loaders), so the filters
+# can binary-search it and its slices instead of scanning every row. The mark belongs to the date
+# array, not to the frame: re-sorted, sampled or concatenated frames get new date arrays and are not
+# marked. Loaded frames are not meant to be edited in place (memory-mapped ones cannot be).
+def mark_sorted_by_date(df):
+    buffer = date_buffer(df['date'].to_numpy())
+    sorted_date_buffers[id(buffer)] = buffer
+    return df
+
+# Function to tell whether the dates of a frame are a forward view of a marked date array (O(1))
+def is_sorted_by_date(dates):
+    if not isinstance(dates, np.ndarray) or dates.ndim != 1 or (len(dates) > 1 and dates.strides[0] <= 0):
+        return False
+    buffer = date_buffer(dates)
+    return sorted_date_buffers.get(id(buffer)) is buffer
+
+# Function to select the rows with start_date <= date <= end_date (or < end_date if not inclusive).
+# Date-sorted frames (marked by the loaders) are cut with two binary searches into a zero-copy slice;
+# other frames (e.g. several countries from query(), or re-sorted ones) fall back to a boolean mask.
+def slice_by_dates(df, start_date, end_date, inclusive=True):
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    dates = df['date'].to_numpy()
+    if is_sorted_by_date(dates):
+        # Search with the unit of the column, otherwise NumPy converts the whole column first
+        first = dates.searchsorted(start_date.to_datetime64().astype(dates.dtype), side='left')
+        last = dates.searchsorted(end_date.to_datetime64().astype(dates.dtype), side='right' if inclusive else 'left')
+        return df.iloc[first:last]
+    if inclusive:
+        return df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    return df[(df['date'] >= start_date) & (df['date'] < end_date)]
+
+# Function to build cumulative prefix sums of the metrics.
+# Row i holds the sums of rows 0..i-1, so the total of rows first..last-1 is prefix[last] - prefix[first].
+def build_prefix_sums(df):
+    prefix = np.zeros((len(df) + 1, len(METRICS)), dtype=np.int64)
+    np.cumsum(df[METRICS].fillna(0).to_numpy(dtype=np.int64), axis=0, out=prefix[1:])
+    return prefix
+
+# Function to remember the rollups of a freshly loaded country frame
+def register_rollups(country, df, prefix=None):
+    days = df['date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    rollup_cache[country] = {"days": days, "prefix": build_prefix_sums(df) if prefix is None else prefix}
+
+# Function to get the rollups of a country, loading its data if needed
+def get_rollups(country):
+    if country not in rollup_cache and read_country_frame(country) is None:
+        return None
+    return rollup_cache[country]
+
+# Function to turn the difference of two prefix rows into {metric: total}
+def prefix_totals(prefix, first, last):
+    totals = prefix[last] - prefix[first]
+    return {metric: int(total) for metric, total in zip(METRICS, totals)}
+
+# Function to total the metrics of a country between two dates (inclusive) in O(1) after load
+def aggregate(country, start_date=None, end_date=None):
+    rollups = get_rollups(country)
+    if rollups is None:
+        return None
+    days = rollups["days"]
+    first = 0 if start_date is None else days.searchsorted(day_number(start_date), side='left')
+    last = len(days) if end_date is None else days.searchsorted(day_number(end_date), side='right')
+    return prefix_totals(rollups["prefix"], first, max(first, last))
+
+# Function to total the metrics of any frame by summing its columns.
+# To total the stored data of a country between two dates, use aggregate (O(1) from the prefix sums).
+@telemetry.instrument("totals", telemetry.count_input_rows)
+def aggregate_totals(df):
+    return {metric: int(df[metric].sum()) for metric in METRICS}
+
+# Function to total the metrics of a country per month ("M") or per year ("Y")
+def period_totals(country, period="M"):
+    rollups = get_rollups(country)
+    if rollups is None:
+        return None
+    key = f"period_{period}"
+    if key not in rollups:
+        periods = rollups["days"].astype('datetime64[D]').astype(f'datetime64[{period}]')
+        starts, first_rows = np.unique(periods, return_index=True)
+        bounds = np.append(first_rows, len(periods))
+        sums = rollups["prefix"][bounds[1:]] - rollups["prefix"][bounds[:-1]]
+        rollups[key] = pd.DataFrame(sums, columns=METRICS, index=pd.Index(starts, name=period))
+    return rollups[key]
+
+# Function to clean cumulative counters (countries x days) before taking daily deltas.
+# A zero after a positive value means the counter stopped being reported (like recovered since
+# August 2021) and is treated as a missing day. Other drops are downward revisions and are kept
+# as reported (daily_increase counts them as no new cases).
+def correct_cumulative(values):
+    corrected = np.array(values, dtype=np.float64)
+    if corrected.shape[1] < 2:
+        return corrected
+    earlier_max = np.fmax.accumulate(corrected, axis=1)[:, :-1]
+    with np.errstate(invalid='ignore'):
+        corrected[:, 1:][(corrected[:, 1:] == 0) & (earlier_max > 0)] = np.nan
+    return corrected
+
+# Function to get the daily new counts of cleaned cumulative counters (countries x days):
+# the increase since the last known day, NaN on missing days and on the first known day.
+# A downward revision is clipped to 0 on its day, so the days after it keep their increases.
+def daily_increase(values):
+    known = ~np.isnan(values)
+    last_known = np.maximum.accumulate(np.where(known, np.arange(values.shape[1]), -1), axis=1)
+    previous = np.full(values.shape, -1)
+    previous[:, 1:] = last_known[:, :-1]
+    previous_values = np.take_along_axis(values, np.maximum(previous, 0), axis=1)
+    return np.where(known & (previous >= 0), np.maximum(values - previous_values, 0), np.nan)
+
+# Function to average each row over a trailing window of days (NaN until the window is full)
+def rolling_mean(values, window):
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=1)
+    counts = np.cumsum(valid, axis=1)
+    window_sums = sums.copy()
+    window_counts = counts.copy()
+    window_sums[:, window:] -= sums[:, :-window]
+    window_counts[:, window:] -= counts[:, :-window]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts == window, window_sums / window, np.nan)
+
+# Function to compute the derived metrics of many countries at once.
+# counters maps each metric to a (countries x days) float array of cumulative values
+# (NaN where a country has no data); returns {column: (countries x days) array}.
+def compute_derived_metrics(counters):
+    derived = {}
+    corrected = {metric: correct_cumulative(counters[metric]) for metric in METRICS}
+    for metric in METRICS:
+        new = daily_increase(corrected[metric])
+        derived[f"new_{metric}"] = new
+        for window in DERIVED_WINDOWS:
+            derived[f"new_{metric}_avg{window}"] = rolling_mean(new, window)
+
+    cases = corrected['cases']
+    previous_cases = np.roll(cases, 1, axis=1)
+    previous_cases[:, 0] = np.nan
+    week_ago_cases = np.roll(cases, 7, axis=1)
+    week_ago_cases[:, :7] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Daily growth of the case total, case fatality rate and doubling time of the case total over the last week
+        derived['growth_rate'] = np.where(previous_cases > 0, derived['new_cases'] / previous_cases, np.nan)
+        derived['cfr'] = np.where(cases > 0, corrected['deaths'] / cases, np.nan)
+        weekly_growth = np.log(cases / week_ago_cases)
+        derived['doubling_time'] = np.where(weekly_growth > 0, 7 * np.log(2) / weekly_growth, np.nan)
+    return derived
+
+# Function to get the file caching the derived metrics of a country
+def derived_metrics_path(country):
+    return os.path.join(DATA_DIR, f"{country}_covid_derived.npz")
+
+# Function to compute and cache the derived metrics of many countries in one batched pass
+# (all stored countries by default). Countries are aligned on the union of their dates.
+def build_derived_metrics(countries=None):
+    countries = list_stored_countries() if countries is None else list(countries)
+    frames = {}
+    for country in countries:
+        country_df = read_country_frame(country)
+        if country_df is not None:
+            frames[country] = country_df
+    if not frames:
+        return {}
+
+    day_arrays = {c: f['date'].to_numpy(dtype='datetime64[D]').astype(np.int64) for c, f in frames.items()}
+    all_days = np.unique(np.concatenate(list(day_arrays.values())))
+    counters = {metric: np.full((len(frames), len(all_days)), np.nan) for metric in METRICS}
+    positions = {}
+    for row, (country, country_df) in enumerate(frames.items()):
+        positions[country] = all_days.searchsorted(day_arrays[country])
+        for metric in METRICS:
+            counters[metric][row, positions[country]] = metric_values(country_df, metric)
+
+    derived = compute_derived_metrics(counters)
+    results = {}
+    for row, country in enumerate(frames):
+        columns = {'date': day_arrays[country].astype('datetime64[D]')}
+        for name, values in derived.items():
+            columns[name] = values[row, positions[country]].astype(np.float32)
+        np.savez(derived_metrics_path(country), **columns)
+        derived_df = pd.DataFrame(columns)
+        derived_cache[country] = derived_df
+        results[country] = derived_df
+    return results
+
+# Function to get the derived metrics of one country (cached in memory and next to the stored data)
+def get_derived_metrics(country):
+    if country in derived_cache:
+        return derived_cache[country]
+    path = derived_metrics_path(country)
+    if country_data_exists(country) and os.path.exists(path) and os.path.getmtime(path) >= country_data_mtime(country):
+        with np.load(path) as stored:
+            derived_cache[country] = pd.DataFrame({name: stored[name] for name in stored.files})
+        return derived_cache[country]
+    return build_derived_metrics([country]).get(country)
+
+# Function to list the countries that have stored data
+def list_stored_countries():
+    countries = set()
+    for csv_path in glob.glob(os.path.join(DATA_DIR, "*_covid_data.csv")):
+        countries.add(os.path.basename(csv_path)[:-len("_covid_data.csv")])
+    if STORAGE_FORMAT == "npy":
+        for path in glob.glob(os.path.join(DATA_DIR, "*_covid_data")):
+            if os.path.isdir(path):
+                countries.add(os.path.basename(path)[:-len("_covid_data")])
+    elif STORAGE_FORMAT == "sqlite" and os.path.exists(country_data_path(None, "sqlite")):
+        with closing(open_database()) as connection:
+            countries.update(row[0] for row in connection.execute("SELECT country FROM countries"))
+    return sorted(countries)
+
+# Function to align several countries on a shared daily date index.
+# Returns (countries, days, counters): the countries that have data, the union of their days
+# (offsets from 1970-01-01) and {metric: (countries x days) float array, NaN where a day is missing}.
+def align_countries(countries, metrics=None):
+    metrics = metrics or METRICS
+    frames = [(country, get_country_frame(country)) for country in countries]
+    frames = [(country, frame) for country, frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return [], np.empty(0, dtype=np.int64), {metric: np.empty((0, 0)) for metric in metrics}
+
+    day_arrays = [frame['date'].to_numpy(dtype='datetime64[D]').astype(np.int64) for _, frame in frames]
+    all_days = np.unique(np.concatenate(day_arrays))
+    # Every (country, day) value is placed with a single scatter per metric
+    rows = np.repeat(np.arange(len(frames)), [len(days) for days in day_arrays])
+    columns = all_days.searchsorted(np.concatenate(day_arrays))
+    counters = {}
+    for metric in metrics:
+        counters[metric] = np.full((len(frames), len(all_days)), np.nan)
+        counters[metric][rows, columns] = np.concatenate([metric_values(frame, metric) for _, frame in frames])
+    return [country for country, _ in frames], all_days, counters
+
+# Function to compare one metric across countries on a shared date index.
+# view is "total" (cumulative counter) or "daily" (new counts, 7-day average); per_capita divides by
+# the population (per 100,000 people, NaN without a known population) and normalize scales every
+# country to its own peak. Returns (countries, dates, values) with values a (countries x days) array.
+def compare_countries(countries, metric='cases', start_date=None, end_date=None, view="total",
+                      per_capita=False, normalize=False, populations=None):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if view not in ("total", "daily"):
+        raise ValueError(f"Unknown view: {view}")
+    countries, days, counters = align_countries(countries, [metric])
+    values = correct_cumulative(counters[metric])
+    if view == "daily":
+        values = rolling_mean(daily_increase(values), 7)
+
+    # The date window is applied after the daily view, so its first days still have a 7-day average
+    first = days.searchsorted(day_number(start_date)) if start_date else 0
+    last = days.searchsorted(day_number(end_date), side='right') if end_date else len(days)
+    days = days[first:last]
+    values = values[:, first:last]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if per_capita:
+            populations = COUNTRY_POPULATIONS if populations is None else populations
+            population = np.array([populations.get(country, np.nan) for country in countries], dtype=np.float64)
+            values = values / population[:, None] * 100_000
+        if normalize and values.size:
+            peaks = np.nanmax(np.where(np.isnan(values), -np.inf, values), axis=1)
+            values = np.where(peaks[:, None] > 0, values / peaks[:, None], np.nan)
+    return countries, days.astype('datetime64[D]'), values
+
+# Function to get the latest known value of every row of a (countries x days) array
+def latest_values(values):
+    valid = ~np.isnan(values)
+    if not values.size:
+        return np.full(len(values), np.nan)
+    last = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    return np.where(valid.any(axis=1), values[np.arange(len(values)), last], np.nan)
+
+# Function to rank countries by their latest value (highest first, countries without data last)
+def rank_countries(countries, values):
+    latest = latest_values(values)
+    order = np.lexsort((-np.nan_to_num(latest, nan=-np.inf), np.isnan(latest)))
+    ranking = pd.DataFrame({'country': np.asarray(countries, dtype=object)[order], 'value': latest[order]})
+    ranking.insert(0, 'rank', np.arange(1, len(ranking) + 1))
+    return ranking
+
+# Function to plot a comparison as an overlay: every country in one grey line collection and the
+# `highlight` countries with the highest latest values as labelled lines on top
+def plot_country_comparison(countries, dates, values, title, highlight=10, save_path=None):
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    from matplotlib.collections import LineCollection
+
+    figure, axes = plt.subplots(figsize=(12, 6))
+    if values.size:
+        x = mdates.date2num(dates)
+        segments = np.stack([np.broadcast_to(x, values.shape), values], axis=-1)
+        axes.add_collection(LineCollection(segments, colors="0.75", linewidths=1))
+        for row in rank_countries(range(len(countries)), values)['country'][:highlight]:
+            axes.plot(x, values[row], label=str(countries[row]).title(), linewidth=2)
+        axes.autoscale_view()
+        axes.xaxis_date()
+        axes.legend(loc='upper left', fontsize=9)
+
+    axes.set_title(title, fontsize=16)
+    axes.set_xlabel("Date", fontsize=12)
+    axes.tick_params(axis='x', labelrotation=45)
+    axes.grid(True, linestyle='--', alpha=0.6)
+    figure.tight_layout()
+    if save_path is not None:
+        figure.savefig(save_path)
+        plt.close(figure)
+    else:
+        plt.show()
+
+# Function to convert the /countries payload into a table of latest totals indexed by country name
+# (lower case). Returns (table, aliases) where aliases maps ISO2/ISO3 codes to the country names.
+def snapshot_to_table(entries):
+    names = [entry['country'].strip().lower() for entry in entries]
+    table = pd.DataFrame.from_records(entries, columns=SNAPSHOT_FIELDS, index=names)
+    table = table.apply(pd.to_numeric, errors='coerce')
+    table['updated'] = pd.to_datetime([entry.get('updated') for entry in entries], unit='ms')
+    table['continent'] = [entry.get('continent') for entry in entries]
+    table.index.name = 'country'
+    aliases = {}
+    for name, entry in zip(names, entries):
+        for code in ('iso2', 'iso3'):
+            value = (entry.get('countryInfo') or {}).get(code)
+            if value:
+                aliases[value.lower()] = name
+    return table, aliases
+
+# Function to load the latest totals of every country in one request (the /countries endpoint,
+# another URL such as a stand-in, or a local JSON file). The table is kept in memory and reused
+# for SNAPSHOT_TTL_SECONDS; it never touches the stored historical data.
+def load_snapshot(source=None, force=False):
+    with snapshot_lock:
+        if (not force and snapshot["table"] is not None
+                and time.time() - snapshot["loaded_at"] < SNAPSHOT_TTL_SECONDS):
+            return snapshot["table"]
+    if source is None or source.startswith(("http://", "https://")):
+        body, _ = cached_get(source or f"{API_BASE_URL}/countries")
+    else:
+        with open(source, "rb") as snapshot_file:
+            body = snapshot_file.read()
+    table, aliases = snapshot_to_table(json.loads(body))
+    with snapshot_lock:
+        snapshot.update(table=table, aliases=aliases, loaded_at=time.time())
+    return table
+
+# Function to get the latest totals of one country (name, ISO2 or ISO3 code) as a dict (None if unknown)
+def latest_totals(country, source=None):
+    table = load_snapshot(source)
+    country = country.strip().lower()
+    country = snapshot["aliases"].get(country, country)
+    if country not in table.index:
+        return None
+    row = table.loc[country]
+    return {field: (None if pd.isna(value) else value.item() if hasattr(value, "item") else value)
+            for field, value in row.items()}
+
+# Function to rank all countries of the snapshot by one field (highest first)
+def snapshot_ranking(field='cases', top=None, source=None):
+    if field not in SNAPSHOT_FIELDS:
+        raise ValueError(f"Unknown field: {field}")
+    ranking = load_snapshot(source)[field].dropna().sort_values(ascending=False, kind='stable')
+    ranking = ranking.reset_index().head(top) if top else ranking.reset_index()
+    ranking.insert(0, 'rank', np.arange(1, len(ranking) + 1))
+    return ranking
+
+# Function to get the population of every country in the snapshot (e.g. for compare_countries),
+# also under the ISO codes of the country (e.g. "usa")
+def snapshot_populations(source=None):
+    populations = load_snapshot(source)['population'].dropna()
+    populations = {country: int(value) for country, value in populations[populations > 0].items()}
+    for alias, country in snapshot["aliases"].items():
+        if country in populations:
+            populations.setdefault(alias, populations[country])
+    return populations
+
+# Function to export the stored countries (all by default) into the shared dataset, a folder that any
+# number of processes can memory-map read-only:
+#   values.npy       (countries x days x metrics) int64 counters, the largest int64 for missing days
+#   prefix_sums.npy  (countries x days + 1 x metrics) int64 running totals for O(1) window totals
+#   dates.npy        int32 day offsets from 1970-01-01 shared by all countries
+#   index.json       country order, metrics and each country's first and last stored day
+# The folder is published atomically (a failed export leaves nothing behind). Returns its path.
+def export_shared_dataset(countries=None):
+    countries = list_stored_countries() if countries is None else list(countries)
+    countries, days, counters = align_countries(countries)
+    path = os.path.join(DATA_DIR, SHARED_DATASET_NAME)
+    version = new_version_folder(path)
+    try:
+        write_shared_dataset(version, countries, days, counters)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    replace_folder(version, path)
+    return path
+
+# Function to write the files of the shared dataset (see export_shared_dataset) into a folder
+def write_shared_dataset(folder, countries, days, counters):
+    shape = (len(countries), len(days), len(METRICS))
+    missing = np.iinfo(np.int64).max
+    values = np.lib.format.open_memmap(os.path.join(folder, "values.npy"), mode="w+", dtype=np.int64, shape=shape)
+    prefix = np.lib.format.open_memmap(os.path.join(folder, "prefix_sums.npy"), mode="w+", dtype=np.int64,
+                                       shape=(shape[0], shape[1] + 1, shape[2]))
+    prefix[:, 0] = 0
+    stored = np.zeros(shape[:2], dtype=bool)
+    for position, metric in enumerate(METRICS):
+        known = ~np.isnan(counters[metric])
+        counts = np.zeros(shape[:2], dtype=np.int64)
+        counts[known] = counters[metric][known]
+        np.cumsum(counts, axis=1, out=prefix[:, 1:, position])
+        counts[~known] = missing
+        values[:, :, position] = counts
+        stored |= known
+    np.save(os.path.join(folder, "dates.npy"), days.astype(np.int32))
+
+    # Each country only covers the days between its first and last stored day
+    if shape[1]:
+        first = stored.argmax(axis=1)
+        last = shape[1] - stored[:, ::-1].argmax(axis=1)
+    else:
+        first = last = np.zeros(shape[0], dtype=np.int64)
+    index = {"countries": countries, "metrics": METRICS, "ranges": np.stack([first, last], axis=1).tolist(),
+             "created": time.time()}
+    values.flush()
+    prefix.flush()
+    del values, prefix
+    with open(os.path.join(folder, "index.json"), "w") as index_file:
+        json.dump(index, index_file)
+
+# Function to open the shared dataset read-only (None if it was never exported). The arrays are
+# memory-mapped, so every process shares the same pages; the dataset is reopened when a newer
+# export has been published.
+def open_shared_dataset():
+    path = os.path.join(DATA_DIR, SHARED_DATASET_NAME)
+    index_path = os.path.join(path, "index.json")
+    if not os.path.exists(index_path):
+        return None
+    version = (os.path.realpath(path), os.path.getmtime(index_path))
+    if shared_dataset["version"] == version:
+        return shared_dataset
+    with open(index_path) as index_file:
+        index = json.load(index_file)
+    dataset = {"version": version, "path": path, "created": index["created"], "metrics": index["metrics"],
+               "countries": index["countries"], "rows": {country: row for row, country in enumerate(index["countries"])},
+               "ranges": index["ranges"],
+               "values": np.load(os.path.join(path, "values.npy"), mmap_mode='r'),
+               "prefix": np.load(os.path.join(path, "prefix_sums.npy"), mmap_mode='r'),
+               "days": np.load(os.path.join(path, "dates.npy"), mmap_mode='r')}
+    if dataset["values"].dtype != np.int64:
+        return None  # Exported by an older version with float counters; export it again
+    dataset["dates"] = dataset["days"].astype('datetime64[D]').astype('datetime64[s]')
+    shared_dataset.clear()
+    shared_dataset.update(dataset)
+    return shared_dataset
+
+# Function to get a country frame backed by the shared dataset without copying its counters
+# (None if the country is not in the dataset or was stored again after the export).
+# Counters with missing days become nullable Int64 columns over the mapped values (only the mask is
+# private to the process), so the frame has the same integer/<NA> columns as a loaded one.
+# The frame works with filter_by_*, aggregate (O(1) from the shared prefix sums) and plotting.
+def shared_country_frame(country):
+    dataset = open_shared_dataset()
+    if dataset is None or country not in dataset["rows"]:
+        return None
+    if country_data_exists(country) and country_data_mtime(country) > dataset["created"]:
+        return None
+    row = dataset["rows"][country]
+    first, last = dataset["ranges"][row]
+    columns = {'date': dataset["dates"][first:last]}
+    for position, metric in enumerate(dataset["metrics"]):
+        values = dataset["values"][row, first:last, position]
+        missing = values == np.iinfo(np.int64).max
+        columns[metric] = pd.arrays.IntegerArray(values, missing) if missing.any() else values
+    df = pd.DataFrame(columns, copy=False)
+    register_rollups(country, df, dataset["prefix"][row, first:last + 1])
+    return mark_sorted_by_date(df)
+
 # Filter data by date range
+# (df can also be a country name or list of names to query the store directly)
+@telemetry.instrument("filter_by_date_range", telemetry.count_rows)
 def filter_by_date_range(df, start_date, end_date):
-    start_date = pd.to_datetime(start_date)
-    end_date = pd.to_datetime(end_date)
-    return df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    if not isinstance(df, pd.DataFrame):
+        return query(df, start_date, end_date)
+    return slice_by_dates(df, start_date, end_date)
 
 # Filter data by a specific date
+@telemetry.instrument("filter_by_specific_date", telemetry.count_rows)
 def filter_by_specific_date(df, specific_date):
-    specific_date = pd.to_datetime(specific_date)
-    return df[df['date'] == specific_date]
+    if not isinstance(df, pd.DataFrame):
+        return query(df, specific_date, specific_date)
+    return slice_by_dates(df, specific_date, specific_date)
 
-# Filter data by a specific year
+# Filter data by a specific year (the source frame is not modified)
+@telemetry.instrument("filter_by_year", telemetry.count_rows)
 def filter_by_year(df, year):
-    df['year'] = df['date'].dt.year
-    return df[df['year'] == year]
+    if not isinstance(df, pd.DataFrame):
+        return query(df, f"{year}-01-01", f"{year}-12-31")
+    return slice_by_dates(df, pd.Timestamp(year, 1, 1), pd.Timestamp(year + 1, 1, 1), inclusive=False)
 
-# Visualize data with country name in the title
-def plot_covid_trends(df, title, country):
-    if df.empty:
-        messagebox.showinfo("No Data", "No data available to plot.")
-        return
-    
-    plt.figure(figsize=(12, 6))
-    
-    # Plot each trend
-    plt.plot(df['date'], df['cases'], label='Cases', color='blue', linestyle='-', linewidth=2)
-    plt.plot(df['date'], df['recovered'], label='Recoveries', color='green', linestyle='-', linewidth=2)
-    plt.plot(df['date'], df['deaths'], label='Deaths', color='red', linestyle='-', linewidth=2)
-    plt.plot(df['date'], df['vaccinations'], label='Vaccinations', color='purple', linestyle='-', linewidth=2)
+# Function to get the first and last date (inclusive) that filter_function(df, *args) selects
+def filter_dates(filter_function, *args):
+    if filter_function is filter_by_year:
+        return f"{args[0]}-01-01", f"{args[0]}-12-31"
+    if filter_function is filter_by_specific_date:
+        return args[0], args[0]
+    return args
 
-    # Prepare the title based on the filtering
+# Function to refresh (or download) a country and load it; runs on the background worker.
+# Returns (status, df) where status is as in update_country_data and df is None if nothing is stored.
+def fetch_and_load_country(country):
+    status = update_country_data(country)
+    if status is None and not country_data_exists(country):
+        return status, None
+    return status, get_country_frame(country)
+
+# Function to apply a filter to the loaded data of a country and total the result; runs on the
+# background worker. The totals of the filtered days come from the prefix sums of the country.
+def filter_and_total(filter_function, country, df, *args):
+    df_filtered = filter_function(df, *args)
+    totals = aggregate(country, *filter_dates(filter_function, *args))
+    return df_filtered, aggregate_totals(df_filtered) if totals is None else totals
+
+# Function to prepare the chart title based on the filtering
+def chart_title(df, title, country):
     if filter_type == "date_range":
-        title = f"{title} for {country.title()} (Date Range: {df['date'].min().date()} to {df['date'].max().date()})"
+        return f"{title} for {country.title()} (Date Range: {df['date'].min().date()} to {df['date'].max().date()})"
     elif filter_type == "specific_date":
-        title = f"{title} for {country.title()} (Specific Date: {df['date'].iloc[0].date()})"
+        return f"{title} for {country.title()} (Specific Date: {df['date'].iloc[0].date()})"
     elif filter_type == "year":
-        title = f"{title} for {country.title()} (Year: {df['date'].dt.year.iloc[0]})"
+        return f"{title} for {country.title()} (Year: {df['date'].dt.year.iloc[0]})"
     else:
-        title = f"{title} for {country.title()}"
+        return f"{title} for {country.title()}"
+
+# Function to pick the points worth drawing in a long series: the first and last point plus the
+# minimum and maximum of each of `buckets` equal slices, so peaks survive at any resolution.
+# Returns the indices of the kept points (all of them if the series is already short enough).
+def downsample_minmax(values, buckets):
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if buckets <= 0 or n <= 2 * buckets:
+        return np.arange(n)
+
+    size = -(-n // buckets)  # Points per bucket, rounded up
+    rows = np.full((-(-n // size), size), np.nan)
+    rows.flat[:n] = values
+    missing = np.isnan(rows)
+    offsets = np.arange(len(rows)) * size
+    lowest = offsets + np.where(missing, np.inf, rows).argmin(axis=1)
+    highest = offsets + np.where(missing, -np.inf, rows).argmax(axis=1)
+    return np.unique(np.concatenate(([0, n - 1], lowest, highest)))
+
+# Function to create the chart embedded in the dashboard window (with a zoom/pan toolbar).
+# It is created once; later plots only replace the line data (see update_chart).
+def create_chart(parent):
+    global chart
+    import tkinter as tk
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+    figure = Figure(figsize=(9, 4.5))
+    axes = figure.add_subplot()
+    lines = {}
+    for column, label, color in SERIES_STYLES:
+        lines[column], = axes.plot([], [], label=label, color=color, linestyle='-', linewidth=2)
+
+    axes.xaxis_date()
+    axes.set_title(" ", fontsize=14)  # Reserves room for the title in the layout below
+    axes.set_xlabel("Date", fontsize=12)
+    axes.set_ylabel("Counts", fontsize=12)
+    axes.tick_params(axis='x', labelrotation=45)
+    axes.grid(True, linestyle='--', alpha=0.6)
+    axes.legend(loc='upper left')
+
+    # Hover read-out; it is animated, so it is drawn with blitting instead of full redraws
+    cursor_line = axes.axvline(0, color='gray', linewidth=1, animated=True, visible=False)
+    cursor_text = axes.text(0.99, 0.97, "", transform=axes.transAxes, ha='right', va='top', animated=True)
+
+    chart_frame = tk.Frame(parent)
+    canvas = FigureCanvasTkAgg(figure, master=chart_frame)
+    toolbar = NavigationToolbar2Tk(canvas, chart_frame, pack_toolbar=False)
+    toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    chart = {"figure": figure, "axes": axes, "lines": lines, "canvas": canvas,
+             "cursor_line": cursor_line, "cursor_text": cursor_text,
+             "background": None, "x": np.empty(0), "df": None}
+    canvas.mpl_connect('draw_event', save_chart_background)
+    canvas.mpl_connect('motion_notify_event', move_chart_cursor)
+    axes.callbacks.connect('xlim_changed', zoom_chart)
+    figure.tight_layout()
+    return chart_frame
+
+# Function to draw rows first..last-1 of the current chart data, downsampled to the axes width in pixels
+def draw_chart_range(first, last):
+    x = chart["x"][first:last]
+    buckets = int(chart["axes"].bbox.width)
+    for column, line in chart["lines"].items():
+        values = chart["values"][column][first:last]
+        kept = downsample_minmax(values, buckets)
+        line.set_data(x[kept], values[kept])
+
+# Function to recompute the downsampled lines for the visible dates after a zoom or pan
+def zoom_chart(axes):
+    if not len(chart["x"]):
+        return
+    low, high = axes.get_xlim()
+    first = max(chart["x"].searchsorted(low) - 1, 0)
+    last = min(chart["x"].searchsorted(high) + 1, len(chart["x"]))
+    draw_chart_range(first, last)
+
+# Function to redraw the embedded chart in place with new data
+def update_chart(df, title):
+    import matplotlib.dates as mdates
+    chart["x"] = mdates.date2num(df['date'].to_numpy())
+    chart["df"] = df
+    chart["values"] = {column: metric_values(df, column) for column in METRICS}
+    draw_chart_range(0, len(df))
+    chart["cursor_line"].set_visible(False)
+    axes = chart["axes"]
+    axes.set_title(title, fontsize=14)
+    axes.relim(visible_only=True)
+    axes.autoscale_view()
+    chart["canvas"].draw_idle()
+
+# Function to remember the rendered chart (without the cursor) after every full redraw
+def save_chart_background(event):
+    chart["background"] = chart["canvas"].copy_from_bbox(chart["figure"].bbox)
+
+# Function to move the hover read-out: restore the saved background, draw only the cursor and blit it
+def move_chart_cursor(event):
+    if chart["background"] is None or event.inaxes is not chart["axes"] or not len(chart["x"]):
+        return
+    row = min(chart["x"].searchsorted(event.xdata), len(chart["x"]) - 1)
+    chart["cursor_line"].set_xdata([chart["x"][row], chart["x"][row]])
+    chart["cursor_line"].set_visible(True)
+    readings = []
+    for column, label, _ in SERIES_STYLES:
+        value = chart["values"][column][row]
+        readings.append(f"{label}: {'n/a' if np.isnan(value) else f'{int(value):,}'}")
+    chart["cursor_text"].set_text(f"{chart['df']['date'].iloc[row].date()}  " + "  ".join(readings))
+
+    canvas = chart["canvas"]
+    canvas.restore_region(chart["background"])
+    chart["axes"].draw_artist(chart["cursor_line"])
+    chart["axes"].draw_artist(chart["cursor_text"])
+    canvas.blit(chart["figure"].bbox)
+
+# Function to report a message in a dialog while the dashboard is running, otherwise on the console
+def show_message(kind, title, message):
+    if chart is None:
+        print(f"{title}: {message}")
+        return
+    from tkinter import messagebox
+    getattr(messagebox, f"show{kind}")(title, message)
+
+# Visualize data with country name in the title
+# (in the embedded chart when the dashboard is running, otherwise in a pyplot window,
+# or written to save_path, e.g. "chart.png", when one is given)
+@telemetry.instrument("plot", telemetry.count_input_rows)
+def plot_covid_trends(df, title, country, save_path=None):
+    if df.empty:
+        show_message("info", "No Data", "No data available to plot.")
+        return
+
+    title = chart_title(df, title, country)
+    if chart is not None and save_path is None:
+        update_chart(df, title)
+        return
+
+    import matplotlib.pyplot as plt
+    figure = plt.figure(figsize=(12, 6))
+    
+    # Plot each trend, downsampled to about one bucket per horizontal pixel
+    buckets = int(figure.get_figwidth() * figure.dpi)
+    for column, label, color in SERIES_STYLES:
+        values = metric_values(df, column)
+        kept = downsample_minmax(values, buckets)
+        plt.plot(df['date'].iloc[kept], values[kept], label=label, color=color, linestyle='-', linewidth=2)
 
     # Set the title and labels
     plt.title(title, fontsize=16)
@@ -123,40 +1641,89 @@ def plot_covid_trends(df, title, country):
     # Tighten layout to ensure everything fits
     plt.tight_layout()
 
-    # Show the plot
-    plt.show()
+    # Save the plot to a file, or show it
+    if save_path is not None:
+        figure.savefig(save_path)
+        plt.close(figure)
+    else:
+        plt.show()
 
 # Tkinter GUI application
 def run_dashboard():
+    import tkinter as tk
+    from tkinter import messagebox, ttk
+
+    # Slow work runs on a single background worker (so jobs finish in order) and the
+    # Tk loop polls for results, keeping the window responsive during fetches and loads
+    executor = ThreadPoolExecutor(max_workers=1)
+    pending_jobs = []  # (future, on_done) pairs waiting for a result
+
+    def run_in_background(function, args, on_done, message):
+        future = executor.submit(function, *args)
+        pending_jobs.append((future, on_done))
+        status_label.config(text=message)
+        status_label.pack(pady=2)
+        progress_bar.pack(pady=2)
+        cancel_button.pack(pady=2)
+        progress_bar.start(10)
+
+    def check_jobs():
+        for job in pending_jobs[:]:
+            future, on_done = job
+            if not future.done():
+                continue
+            pending_jobs.remove(job)
+            if future.exception() is not None:
+                messagebox.showerror("Error", f"An error occurred: {str(future.exception())}")
+            else:
+                on_done(future.result())
+        if not pending_jobs:
+            hide_progress()
+        root.after(POLL_INTERVAL_MS, check_jobs)
+
+    def hide_progress():
+        progress_bar.stop()
+        status_label.pack_forget()
+        progress_bar.pack_forget()
+        cancel_button.pack_forget()
+
+    # A job that is already running cannot be interrupted, but its result is dropped
+    def cancel_jobs():
+        for future, _ in pending_jobs:
+            future.cancel()
+        pending_jobs.clear()
+        hide_progress()
+
     def search_country():
-        global df  # Make df global so it's accessible across functions
         country = country_entry.get().strip().lower()
         if not country:
             messagebox.showwarning("Input Error", "Please enter a country name.")
             return
 
-        # Check if CSV file exists
-        try:
-            df = pd.read_csv(f"{country}_covid_data.csv")
-            df['date'] = pd.to_datetime(df['date'])
-            messagebox.showinfo("Success", f"Data for {country.title()} is already available.")
-        except FileNotFoundError:
-            # Fetch the data if CSV doesn't exist
-            data = fetch_country_data(country)
-            if data:
-                save_data_to_csv(country, data)
-                df = pd.read_csv(f"{country}_covid_data.csv")
-                df['date'] = pd.to_datetime(df['date'])
-                messagebox.showinfo("Success", f"Data for {country.title()} loaded and saved.")
-            else:
+        def on_loaded(result):
+            global df, df_country  # Make df global so it's accessible across functions
+            status, loaded_df = result
+            if loaded_df is None:
                 messagebox.showerror("Error", f"No data available for country '{country}'. Please check the spelling.")
                 return
-        
-        # Enable filter option selection
-        option_label.pack(pady=10)
-        date_range_button.pack(pady=5)
-        specific_date_button.pack(pady=5)
-        year_button.pack(pady=5)
+
+            df = loaded_df
+            df_country = country
+            if status == "created":
+                messagebox.showinfo("Success", f"Data for {country.title()} loaded and saved.")
+            elif status == "updated":
+                messagebox.showinfo("Success", f"Data for {country.title()} has been updated.")
+            else:
+                messagebox.showinfo("Success", f"Data for {country.title()} is already available.")
+
+            # Enable filter option selection
+            option_label.pack(pady=10)
+            date_range_button.pack(pady=5)
+            specific_date_button.pack(pady=5)
+            year_button.pack(pady=5)
+
+        # Download the data if nothing is stored yet, or only the missing days if it is stale
+        run_in_background(fetch_and_load_country, (country,), on_loaded, f"Loading data for {country.title()}...")
 
     def choose_date_range():
         for widget in input_frame.winfo_children():
@@ -171,31 +1738,30 @@ def run_dashboard():
         end_date_entry.pack(pady=5)
 
         def apply_date_range():
-            global filter_type
             start_date = start_date_entry.get().strip()
             end_date = end_date_entry.get().strip()
             if not start_date or not end_date:
                 messagebox.showwarning("Input Error", "Please enter both start and end dates.")
                 return
 
-            try:
-                df_filtered = filter_by_date_range(df, start_date, end_date)
+            def on_filtered(result):
+                global filtered_data, filter_type
+                df_filtered, totals = result
                 if df_filtered.empty:
                     messagebox.showinfo("No Data", "No data available for the selected date range.")
                     return
 
                 # Display total quantities
-                display_totals(df_filtered)
+                display_totals(totals)
 
                 # Enable Show Graph button after applying the filter
                 show_graph_button.pack(pady=10)
 
                 # Store filtered data for later use in plotting
-                global filtered_data
                 filtered_data = df_filtered
                 filter_type = "date_range"  # Track that date range filter is applied
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+            run_in_background(filter_and_total, (filter_by_date_range, df_country, df, start_date, end_date), on_filtered, "Filtering...")
 
         tk.Button(input_frame, text="Apply", command=apply_date_range).pack(pady=10)
 
@@ -208,30 +1774,29 @@ def run_dashboard():
         specific_date_entry.pack(pady=5)
 
         def apply_specific_date():
-            global filter_type
             specific_date = specific_date_entry.get().strip()
             if not specific_date:
                 messagebox.showwarning("Input Error", "Please enter a specific date.")
                 return
 
-            try:
-                df_filtered = filter_by_specific_date(df, specific_date)
+            def on_filtered(result):
+                global filtered_data, filter_type
+                df_filtered, totals = result
                 if df_filtered.empty:
                     messagebox.showinfo("No Data", "No data available for the selected date.")
                     return
 
                 # Display total quantities
-                display_totals(df_filtered)
+                display_totals(totals)
 
                 # Enable Show Graph button after applying the filter
                 show_graph_button.pack(pady=10)
 
                 # Store filtered data for later use in plotting
-                global filtered_data
                 filtered_data = df_filtered
                 filter_type = "specific_date"  # Track that specific date filter is applied
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+            run_in_background(filter_and_total, (filter_by_specific_date, df_country, df, specific_date), on_filtered, "Filtering...")
 
         tk.Button(input_frame, text="Apply", command=apply_specific_date).pack(pady=10)
 
@@ -244,39 +1809,44 @@ def run_dashboard():
         year_entry.pack(pady=5)
 
         def apply_year():
-            global filter_type
             year = year_entry.get().strip()
             if not year:
                 messagebox.showwarning("Input Error", "Please enter a year.")
                 return
 
             try:
-                df_filtered = filter_by_year(df, int(year))
+                year = int(year)
+            except ValueError as e:
+                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+                return
+
+            def on_filtered(result):
+                global filtered_data, filter_type
+                df_filtered, totals = result
                 if df_filtered.empty:
                     messagebox.showinfo("No Data", f"No data available for the year {year}.")
                     return
 
                 # Display total quantities
-                display_totals(df_filtered)
+                display_totals(totals)
 
                 # Enable Show Graph button after applying the filter
                 show_graph_button.pack(pady=10)
 
                 # Store filtered data for later use in plotting
-                global filtered_data
                 filtered_data = df_filtered
                 filter_type = "year"  # Track that year filter is applied
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {str(e)}")
+
+            run_in_background(filter_and_total, (filter_by_year, df_country, df, year), on_filtered, "Filtering...")
 
         tk.Button(input_frame, text="Apply", command=apply_year).pack(pady=10)
 
-    # Display total quantities in the GUI
-    def display_totals(df):
-        total_cases = df['cases'].sum()
-        total_deaths = df['deaths'].sum()
-        total_recovered = df['recovered'].sum()
-        total_vaccinations = df['vaccinations'].sum()
+    # Display total quantities (as returned by filter_and_total) in the GUI
+    def display_totals(totals):
+        total_cases = totals['cases']
+        total_deaths = totals['deaths']
+        total_recovered = totals['recovered']
+        total_vaccinations = totals['vaccinations']
 
         # Update the labels with total values
         total_cases_label.config(text=f"Total Cases: {total_cases:,}", fg="blue")
@@ -293,6 +1863,7 @@ def run_dashboard():
         if filtered_data is not None and not filtered_data.empty:
             # Add title and display the graph with the selected filter dates
             country = country_entry.get().strip()
+            chart_frame.pack(fill=tk.BOTH, expand=True)
             plot_covid_trends(filtered_data, "COVID-19 Data", country)
         else:
             messagebox.showinfo("No Data", "Please apply a filter before plotting.")
@@ -307,6 +1878,13 @@ def run_dashboard():
     country_entry.pack(pady=5)
     tk.Button(root, text="Search", command=search_country).pack(pady=10)
 
+    # Progress indicator for background jobs (shown only while one is running)
+    progress_frame = tk.Frame(root)
+    progress_frame.pack()
+    status_label = tk.Label(progress_frame, text="")
+    progress_bar = ttk.Progressbar(progress_frame, mode="indeterminate", length=200)
+    cancel_button = tk.Button(progress_frame, text="Cancel", command=cancel_jobs)
+
     # Step 2: Option Selection
     option_label = tk.Label(root, text="Choose an option:")
     date_range_button = tk.Button(root, text="Filter by Date Range", command=choose_date_range)
@@ -334,9 +1912,15 @@ def run_dashboard():
 
     # Show Graph button
     show_graph_button = tk.Button(root, text="Show Graph", command=show_graph)
+
+    # Embedded chart (created once, shown by the first Show Graph click)
+    chart_frame = create_chart(root)
     
-    # Start the Tkinter event loop
+    # Start polling for background results and the Tkinter event loop
+    root.after(POLL_INTERVAL_MS, check_jobs)
     root.mainloop()
+    executor.shutdown(wait=False, cancel_futures=True)
 
-# Run the dashboard (Tkinter GUI)
-run_dashboard()
+# Run the dashboard (Tkinter GUI) when started as a script
+if __name__ == "__main__":
+    run_dashboard()
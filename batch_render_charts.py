@@ -0,0 +1,148 @@
+# Batch rendering of COVID-19 charts to image files on a pool of worker processes
+# Usage examples:
+#   python batch_render_charts.py --all-countries --window all --window year:2021 --window last:90
+#   python batch_render_charts.py --country india --country usa --window range:2021-01-01:2021-06-30 --format svg
+# Windows: "all", "year:YYYY", "date:YYYY-MM-DD", "range:START:END" or "last:N" (the last N stored days).
+# Every run writes the charts and a manifest.json describing them to the output folder.
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-worker state: the dashboard module, one reusable figure and the last loaded country
+worker = {}
+
+# Function to set up a worker process: non-interactive backend and a figure template reused for every job
+def init_worker(data_dir, storage_format, shared=False):
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+
+    dashboard.DATA_DIR = data_dir
+    dashboard.STORAGE_FORMAT = storage_format
+    dashboard.SHARED_DATASET = shared  # Workers then map the same dataset pages instead of loading copies
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    lines = {}
+    for column, label, color in dashboard.SERIES_STYLES:
+        lines[column], = axes.plot([], [], label=label, color=color, linestyle='-', linewidth=2)
+    axes.xaxis_date()
+    axes.set_xlabel("Date", fontsize=12)
+    axes.set_ylabel("Counts", fontsize=12)
+    axes.tick_params(axis='x', labelrotation=45)
+    axes.grid(True, linestyle='--', alpha=0.6)
+    axes.legend(loc='upper left')
+    worker.update(dashboard=dashboard, figure=figure, axes=axes, lines=lines, country=None, df=None)
+
+# Function to apply a window such as "year:2021" to a country frame. Returns (df, filter_type).
+def apply_window(dashboard, df, window):
+    kind, _, value = window.partition(":")
+    if kind == "all":
+        return df, None
+    if kind == "year":
+        return dashboard.filter_by_year(df, int(value)), "year"
+    if kind == "date":
+        return dashboard.filter_by_specific_date(df, value), "specific_date"
+    if kind == "range":
+        start_date, end_date = value.split(":")
+        return dashboard.filter_by_date_range(df, start_date, end_date), "date_range"
+    if kind == "last":
+        days = int(value)
+        if days <= 0:
+            raise ValueError(f"Window {window} needs a positive number of days")  # df.iloc[-0:] is every row
+        return df.iloc[-days:], "date_range"
+    raise ValueError(f"Unknown window: {window}")
+
+# Function to get a file name part for a window, e.g. "range:2021-01-01:2021-06-30" -> "range_2021-01-01_2021-06-30"
+def window_slug(window):
+    return window.replace(":", "_")
+
+# Function to render one (country, window) job in a worker process; returns its manifest entry
+def render_job(job):
+    import matplotlib.dates as mdates
+    country, window, output_dir, image_format = job
+    dashboard = worker["dashboard"]
+    start = time.perf_counter()
+    entry = {"country": country, "window": window, "file": None, "rows": 0, "error": None}
+    try:
+        # Jobs are sorted by country, so consecutive jobs reuse the loaded frame
+        if worker["country"] != country:
+            worker["df"] = dashboard.get_country_frame(country)
+            worker["country"] = country
+        if worker["df"] is None:
+            raise ValueError(f"No stored data for {country}")
+        df, dashboard.filter_type = apply_window(dashboard, worker["df"], window)
+        entry["rows"] = len(df)
+        if df.empty:
+            raise ValueError("No data available for the selected window")
+
+        axes = worker["axes"]
+        x = mdates.date2num(df['date'].to_numpy())
+        buckets = int(axes.bbox.width)
+        for column, line in worker["lines"].items():
+            values = dashboard.metric_values(df, column)
+            kept = dashboard.downsample_minmax(values, buckets)
+            line.set_data(x[kept], values[kept])
+        axes.set_title(dashboard.chart_title(df, "COVID-19 Data", country), fontsize=16)
+        axes.relim()
+        axes.autoscale_view()
+        worker["figure"].tight_layout()
+
+        file_name = f"{country}_{window_slug(window)}.{image_format}"
+        worker["figure"].savefig(os.path.join(output_dir, file_name))
+        entry["file"] = file_name
+    except Exception as e:
+        entry["error"] = str(e)
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+    return entry
+
+# Function to render every (country, window) combination and write manifest.json.
+# Returns the manifest entries in job order.
+def render_charts(countries, windows, output_dir="charts", image_format="png", workers=None,
+                  data_dir=".", storage_format="npy", shared=False):
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(country, window, output_dir, image_format) for country in sorted(countries) for window in windows]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(data_dir, storage_format, shared)) as executor:
+        # Chunks of one country's windows go to the same worker, keeping its frame cache warm
+        entries = list(executor.map(render_job, jobs, chunksize=max(len(windows), 1)))
+
+    manifest = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "seconds": round(time.perf_counter() - start, 3),
+                "format": image_format, "charts": entries}
+    with open(os.path.join(output_dir, "manifest.json"), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return entries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render COVID-19 charts for many countries and date windows.")
+    parser.add_argument("--country", action="append", default=[], help="Country name (repeat for several)")
+    parser.add_argument("--all-countries", action="store_true", help="Render every country with stored data")
+    parser.add_argument("--window", action="append", default=[], help="Date window (repeat for several, default: all)")
+    parser.add_argument("--output-dir", default="charts", help="Folder for the images and manifest.json")
+    parser.add_argument("--format", default="png", choices=["png", "svg", "pdf"], help="Image format")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--shared", action="store_true", help="Read countries from the shared memory-mapped dataset")
+    args = parser.parse_args(argv)
+
+    import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+    countries = [country.strip().lower() for country in args.country]
+    if args.all_countries:
+        countries = sorted(set(countries) | set(dashboard.list_stored_countries()))
+    if not countries:
+        parser.error("Please give --country or --all-countries.")
+
+    entries = render_charts(countries, args.window or ["all"], args.output_dir, args.format, args.workers,
+                            dashboard.DATA_DIR, dashboard.STORAGE_FORMAT, args.shared)
+    failed = [entry for entry in entries if entry["error"]]
+    print(f"{len(entries) - len(failed)} charts written to {args.output_dir} ({len(failed)} failed).")
+    for entry in failed:
+        print(f"  {entry['country']} {entry['window']}: {entry['error']}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
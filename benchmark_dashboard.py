@@ -0,0 +1,326 @@
+# Benchmarks for the COVID-19 Data Dashboard hot paths on synthetic data (runs fully offline)
+# Usage:
+#   python benchmark_dashboard.py [--country india]             micro-benchmarks (the country is used for the CLI query)
+#   python benchmark_dashboard.py --suite --countries 50 --days 1143 --save-baseline baseline.json
+#   python benchmark_dashboard.py --suite --baseline baseline.json   exits with 1 if a stage got slower
+#   python benchmark_dashboard.py --shared-dataset --readers 1 4 8    load time and memory of concurrent readers
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+
+# Function to build a synthetic date-sorted series with one row per day
+def make_synthetic_frame(days, start="1000-01-01"):
+    dates = np.arange(np.datetime64(start, 'D'), np.datetime64(start, 'D') + days).astype('datetime64[s]')
+    counts = np.arange(days, dtype=np.int64)
+    df = pd.DataFrame({'date': dates, 'cases': counts * 10, 'deaths': counts,
+                       'recovered': counts * 5, 'vaccinations': counts * 3})
+    return dashboard.mark_sorted_by_date(df)
+
+# Function to time a call, returning the best of several runs in seconds
+def best_time(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Boolean-mask filters as they were before the binary-search engine, for comparison
+def mask_filter_by_date_range(df, start_date, end_date):
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+    return df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+
+def mask_filter_by_specific_date(df, specific_date):
+    return df[df['date'] == pd.to_datetime(specific_date)]
+
+def mask_filter_by_year(df, year):
+    return df[df['date'].dt.year == year]
+
+# Function to compare the mask filters with the binary-search filters on growing series
+def benchmark_filters(sizes=(10_000, 100_000, 1_000_000)):
+    print("Filter benchmark (best of 5, milliseconds)")
+    print(f"{'rows':>10} {'filter':>14} {'mask':>10} {'search':>10} {'speedup':>9}")
+    for size in sizes:
+        df = make_synthetic_frame(size)
+        cases = [
+            ("date_range", lambda: mask_filter_by_date_range(df, "1500-01-01", "1500-12-31"),
+             lambda: dashboard.filter_by_date_range(df, "1500-01-01", "1500-12-31")),
+            ("specific_date", lambda: mask_filter_by_specific_date(df, "1500-06-15"),
+             lambda: dashboard.filter_by_specific_date(df, "1500-06-15")),
+            ("year", lambda: mask_filter_by_year(df, 1500),
+             lambda: dashboard.filter_by_year(df, 1500)),
+        ]
+        for name, mask_filter, search_filter in cases:
+            assert mask_filter().equals(search_filter())
+            mask_seconds = best_time(mask_filter)
+            search_seconds = best_time(search_filter)
+            print(f"{size:>10} {name:>14} {mask_seconds * 1000:>10.3f} {search_seconds * 1000:>10.3f} "
+                  f"{mask_seconds / search_seconds:>8.1f}x")
+
+# Function to render the four series of a frame off-screen, optionally downsampled to the axes width
+def render_series(df, downsample):
+    figure = Figure(figsize=(12, 6))
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    buckets = int(axes.bbox.width)
+    for column, label, color in dashboard.SERIES_STYLES:
+        values = df[column].to_numpy()
+        kept = dashboard.downsample_minmax(values, buckets) if downsample else slice(None)
+        axes.plot(df['date'].to_numpy()[kept], values[kept], label=label, color=color, linewidth=2)
+    canvas.draw()
+
+# Function to compare full and downsampled plotting on noisy series of growing length
+def benchmark_plotting(sizes=(1_000, 100_000, 1_000_000)):
+    print("Plot render benchmark (best of 3, milliseconds)")
+    print(f"{'points':>10} {'full':>10} {'downsampled':>12} {'speedup':>9}")
+    rng = np.random.default_rng(0)
+    for size in sizes:
+        df = make_synthetic_frame(size)
+        for column in dashboard.METRICS:
+            df[column] = df[column] + rng.integers(0, size, size)
+        full_seconds = best_time(lambda: render_series(df, downsample=False), repeat=3)
+        downsampled_seconds = best_time(lambda: render_series(df, downsample=True), repeat=3)
+        print(f"{size:>10} {full_seconds * 1000:>10.1f} {downsampled_seconds * 1000:>12.1f} "
+              f"{full_seconds / downsampled_seconds:>8.1f}x")
+
+# Function to build a synthetic API timeline ({"cases": {"M/D/YY": n}, ...}) shaped like the disease.sh payload
+def make_synthetic_timeline(days, start="2020-01-22"):
+    dates = pd.date_range(start, periods=days, freq="D")
+    keys = [f"{date.month}/{date.day}/{date.year % 100}" for date in dates]
+    counts = range(days)
+    return {'cases': {key: n * 10 for key, n in zip(keys, counts)},
+            'deaths': {key: n for key, n in zip(keys, counts)},
+            'recovered': {key: n * 5 for key, n in zip(keys, counts)},
+            'vaccinated': {key: n * 3 for key, n in zip(keys[days // 2:], counts)}}
+
+# Timeline parsing as it was before the vectorized ingest (one frame per series, merged and date-parsed), for comparison
+def frame_timeline_to_frame(data):
+    cases = pd.DataFrame.from_dict(data['cases'], orient='index', columns=['cases'])
+    deaths = pd.DataFrame.from_dict(data['deaths'], orient='index', columns=['deaths'])
+    recovered = pd.DataFrame.from_dict(data['recovered'], orient='index', columns=['recovered'])
+    vaccinations = pd.DataFrame.from_dict(data.get('vaccinated', {}), orient='index', columns=['vaccinations'])
+    df = pd.concat([cases, deaths, recovered, vaccinations], axis=1)
+    df.index = pd.to_datetime(df.index, format="%m/%d/%y")
+    df = df.sort_index().reset_index().rename(columns={"index": "date"})
+    return dashboard.apply_schema(df)
+
+# Function to compare frame-based and vectorized parsing of a 200-country payload
+def benchmark_ingest(countries=200, days=1143):
+    payload = {f"country{number}": make_synthetic_timeline(days) for number in range(countries)}
+    parse_all = lambda parse: [parse(timeline) for timeline in payload.values()]
+    assert parse_all(frame_timeline_to_frame)[0].equals(parse_all(dashboard.timeline_to_frame)[0])
+    frames_seconds = best_time(lambda: parse_all(frame_timeline_to_frame), repeat=3)
+    vectorized_seconds = best_time(lambda: parse_all(dashboard.timeline_to_frame), repeat=3)
+    print(f"Timeline ingest of {countries} countries x {days} days (best of 3, milliseconds)")
+    print(f"{'frames':>10} {'vectorized':>11} {'speedup':>9}")
+    print(f"{frames_seconds * 1000:>10.1f} {vectorized_seconds * 1000:>11.1f} "
+          f"{frames_seconds / vectorized_seconds:>8.1f}x")
+
+# Function to measure the cold start of the headless CLI (a fresh Python process per run)
+def benchmark_cli_startup(country=None, repeat=5):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "covid_dash.py")
+    commands = [("--help", [script, "--help"])]
+    if country is not None:
+        commands.append(("query --totals", [script, "query", "--country", country, "--totals"]))
+    print("CLI cold start (best of 5, milliseconds)")
+    for name, command in commands:
+        seconds = best_time(lambda: subprocess.run([sys.executable, *command], capture_output=True, check=True), repeat)
+        print(f"{name:>16} {seconds * 1000:>10.1f}")
+
+# Function to build a synthetic all-countries payload shaped like the disease.sh /historical response
+def make_synthetic_payload(countries=20, days=1143):
+    return [{"country": f"Country {number}", "province": None, "timeline": make_synthetic_timeline(days)}
+            for number in range(countries)]
+
+# Function to run one stage of the suite: best of `repeat` timed runs, then one traced run for peak memory.
+# Returns {"seconds", "items", "per_second", "peak_bytes"}.
+def run_stage(func, items, repeat=3):
+    seconds = best_time(func, repeat)
+    tracemalloc.start()
+    func()
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 6), "items": items, "per_second": round(items / seconds, 1),
+            "peak_bytes": peak_bytes}
+
+# Function to time every stage from the API payload to the chart on `countries` synthetic countries.
+# The data is written to a temporary folder; returns {stage: result of run_stage}.
+def benchmark_suite(countries=20, days=1143, charts=3):
+    import matplotlib
+    matplotlib.use("Agg")
+    payload = make_synthetic_payload(countries, days)
+    names = [entry["country"].lower() for entry in payload]
+    original_data_dir = dashboard.DATA_DIR
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        dashboard.DATA_DIR = data_dir
+        try:
+            payload_path = os.path.join(data_dir, "payload.json")
+            with open(payload_path, "w") as payload_file:
+                json.dump(payload, payload_file)
+            frames = [dashboard.timeline_to_frame(entry["timeline"]) for entry in payload]
+            middle = str(frames[0]['date'].iloc[len(frames[0]) // 2].date())
+            year = frames[0]['date'].iloc[len(frames[0]) // 2].year
+            chart_path = os.path.join(data_dir, "chart.png")
+
+            stages = [
+                ("parse", lambda: [dashboard.timeline_to_frame(entry["timeline"]) for entry in payload], countries),
+                ("write", lambda: [dashboard.write_country_frame(name, frame) for name, frame in zip(names, frames)],
+                 countries),
+                ("stream_ingest", lambda: dashboard.ingest_all_countries(payload_path), countries),
+                ("reload", lambda: [dashboard.read_country_frame(name) for name in names], countries),
+                ("filter_by_date_range", lambda: [dashboard.filter_by_date_range(frame, middle, f"{year + 1}-01-01")
+                                                  for frame in frames], countries),
+                ("filter_by_specific_date", lambda: [dashboard.filter_by_specific_date(frame, middle)
+                                                     for frame in frames], countries),
+                ("filter_by_year", lambda: [dashboard.filter_by_year(frame, year) for frame in frames], countries),
+                ("totals", lambda: [dashboard.aggregate(name, f"{year}-01-01", f"{year}-12-31")
+                                    for name in names], countries),
+                ("plot", lambda: [dashboard.plot_covid_trends(frame, "COVID-19 Data", name, save_path=chart_path)
+                                  for name, frame in zip(names[:charts], frames[:charts])], min(charts, countries)),
+            ]
+            for stage, func, items in stages:
+                results[stage] = run_stage(func, items)
+        finally:
+            dashboard.DATA_DIR = original_data_dir
+    return results
+
+# Function to print the results of the suite, with the change against a baseline when one is given
+def print_suite(results, baseline=None):
+    print(f"{'stage':>24} {'ms':>10} {'items/s':>12} {'peak MB':>9}" + (f" {'vs base':>9}" if baseline else ""))
+    for stage, result in results.items():
+        line = (f"{stage:>24} {result['seconds'] * 1000:>10.2f} {result['per_second']:>12,.0f} "
+                f"{result['peak_bytes'] / 1e6:>9.2f}")
+        if baseline and stage in baseline:
+            line += f" {result['seconds'] / baseline[stage]['seconds']:>8.2f}x"
+        print(line)
+
+# Function to find the stages that got slower than the baseline by more than `tolerance` (0.25 = 25 %)
+def find_regressions(results, baseline, tolerance=0.25):
+    return [stage for stage, result in results.items()
+            if stage in baseline and result["seconds"] > baseline[stage]["seconds"] * (1 + tolerance)]
+
+# Function to get the resident memory of this process: private (RssAnon) and file-backed (RssFile) bytes.
+# Memory-mapped dataset pages are file-backed and shared by every process mapping them.
+def memory_status():
+    try:
+        with open("/proc/self/status") as status_file:
+            fields = dict(line.split(":", 1) for line in status_file if ":" in line)
+        return {key: int(fields[key].split()[0]) * 1024 for key in ("RssAnon", "RssFile")}
+    except (OSError, KeyError):
+        import resource  # Not Linux: only the peak resident size is known
+        return {"RssAnon": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, "RssFile": 0}
+
+# Function run in each reader process: load every country the way `mode` says ("csv" files,
+# private copies of the "npy" columns, or the "shared" dataset), then filter and total each one
+def dataset_reader(data_dir, mode, names, year, barrier, results):
+    dashboard.DATA_DIR = data_dir
+    barrier.wait()  # All readers start loading at the same time
+    before = memory_status()
+    start = time.perf_counter()
+    for name in names:
+        if mode == "csv":
+            df = dashboard.read_country_frame(name, "csv")
+        elif mode == "npy":
+            df = dashboard.read_country_frame(name, mmap=False)
+        else:
+            df = dashboard.shared_country_frame(name)
+        dashboard.filter_by_year(df, year)
+        dashboard.aggregate(name, f"{year}-01-01", f"{year}-12-31")
+        dashboard.aggregate(name)
+    seconds = time.perf_counter() - start
+    after = memory_status()
+    results.put({"seconds": seconds, "private": after["RssAnon"] - before["RssAnon"],
+                 "shared": after["RssFile"] - before["RssFile"]})
+
+# Function to compare CSV files, per-process column copies and the shared memory-mapped dataset
+# with N concurrent reader processes: load time and resident memory per reader
+def benchmark_shared_dataset(countries=200, days=1143, readers=(1, 4, 8)):
+    context = multiprocessing.get_context("spawn")  # Fresh processes, so nothing is inherited from this one
+    payload = make_synthetic_payload(countries, days)
+    names = [entry["country"].lower() for entry in payload]
+    year = int(dashboard.timeline_to_frame(payload[0]["timeline"])['date'].iloc[days // 2].year)
+    original_data_dir = dashboard.DATA_DIR
+    with tempfile.TemporaryDirectory() as data_dir:
+        dashboard.DATA_DIR = data_dir
+        try:
+            for name, entry in zip(names, payload):
+                frame = dashboard.timeline_to_frame(entry["timeline"])
+                dashboard.write_country_frame(name, frame)
+                dashboard.write_country_frame(name, frame, "csv")
+            start = time.perf_counter()
+            dashboard.export_shared_dataset(names)
+            export_seconds = time.perf_counter() - start
+        finally:
+            dashboard.DATA_DIR = original_data_dir
+
+        print(f"Shared dataset: {countries} countries x {days} days, exported in {export_seconds * 1000:.0f} ms")
+        print(f"{'mode':>8} {'readers':>8} {'load ms':>9} {'private MB':>11} {'shared MB':>10} {'all private MB':>15}")
+        for mode in ("csv", "npy", "shared"):
+            for count in readers:
+                barrier = context.Barrier(count)
+                results = context.Queue()
+                processes = [context.Process(target=dataset_reader, args=(data_dir, mode, names, year, barrier, results))
+                             for _ in range(count)]
+                for process in processes:
+                    process.start()
+                measured = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+                load_ms = sum(result["seconds"] for result in measured) / count * 1000
+                private = sum(result["private"] for result in measured) / 1e6
+                shared = sum(result["shared"] for result in measured) / count / 1e6
+                print(f"{mode:>8} {count:>8} {load_ms:>9.1f} {private / count:>11.2f} {shared:>10.2f} {private:>15.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard hot paths on synthetic data.")
+    parser.add_argument("country", nargs="?", help=argparse.SUPPRESS)  # Older usage: the country as an argument
+    parser.add_argument("--country", dest="cli_country", help="Stored country used for the CLI query benchmark")
+    parser.add_argument("--suite", action="store_true", help="Run the staged suite instead of the micro-benchmarks")
+    parser.add_argument("--countries", type=int, default=20, help="Synthetic countries in the suite")
+    parser.add_argument("--days", type=int, default=1143, help="Days per synthetic country")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare with")
+    parser.add_argument("--save-baseline", help="Write the results of this run to a JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    parser.add_argument("--shared-dataset", action="store_true", help="Benchmark concurrent readers of the shared dataset")
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 4, 8], help="Reader processes to compare")
+    args = parser.parse_args()
+
+    if args.shared_dataset:
+        benchmark_shared_dataset(args.countries, args.days, tuple(args.readers))
+        sys.exit(0)
+
+    if not args.suite:
+        benchmark_filters()
+        benchmark_plotting()
+        benchmark_ingest()
+        benchmark_cli_startup(args.cli_country or args.country)
+        sys.exit(0)
+
+    results = benchmark_suite(args.countries, args.days)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["stages"]
+    print(f"Benchmark suite: {args.countries} countries x {args.days} days (best of 3)")
+    print_suite(results, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump({"countries": args.countries, "days": args.days, "stages": results}, baseline_file, indent=2)
+        print(f"Baseline written to {args.save_baseline}.")
+    regressions = find_regressions(results, baseline, args.tolerance) if baseline else []
+    if regressions:
+        print(f"Slower than the baseline: {', '.join(regressions)}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,274 @@
+# Headless command-line interface for the COVID-19 Data Dashboard (no window or display needed)
+# Usage examples:
+#   python covid_dash.py fetch --country india --country usa
+#   python covid_dash.py ingest --source all_countries.json
+#   python covid_dash.py query --country india --year 2021 --totals
+#   python covid_dash.py export --country india --start 2021-01-01 --end 2021-06-30 --output india.csv
+#   python covid_dash.py plot --country india --year 2021 --output india_2021.png
+#   python covid_dash.py compare --all-countries --metric deaths --view daily --per-capita --populations pop.json
+#   python covid_dash.py latest --country india
+#   python covid_dash.py latest --rank deathsPerOneMillion --top 10
+#   python covid_dash.py memory
+#   python covid_dash.py share && python covid_dash.py --shared query --country india --totals
+#   python covid_dash.py --telemetry spans.jsonl --metrics query --country india --totals
+import argparse
+import json
+import sys
+import time
+
+START_TIME = time.perf_counter()
+
+# Function to import the dashboard module only when a subcommand needs it
+# (pandas and NumPy are loaded with it; requests and matplotlib only when fetching or plotting)
+def load_dashboard():
+    import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+    return dashboard
+
+# Function to add the filter options shared by query, export and plot
+def add_filter_arguments(parser):
+    parser.add_argument("--country", required=True, help="Country name, e.g. 'india'")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--date", help="Specific date (YYYY-MM-DD)")
+    group.add_argument("--year", type=int, help="Specific year, e.g. 2021")
+    group.add_argument("--start", help="Start of a date range (YYYY-MM-DD), used with --end")
+    parser.add_argument("--end", help="End of a date range (YYYY-MM-DD), used with --start")
+
+# Function to load the stored data of a country and apply the filter given on the command line.
+# Returns (df, filter_type) or exits with an error message when nothing is stored or a date is invalid.
+def load_filtered(dashboard, args):
+    country = args.country.strip().lower()
+    df = dashboard.get_country_frame(country)
+    if df is None:
+        sys.exit(f"No stored data for '{country}'. Run 'python covid_dash.py fetch --country {country}' first.")
+
+    if args.start or args.end:
+        if not (args.start and args.end):
+            sys.exit("Please enter both --start and --end dates.")
+    try:
+        if args.start:
+            return dashboard.filter_by_date_range(df, args.start, args.end), "date_range"
+        if args.date:
+            return dashboard.filter_by_specific_date(df, args.date), "specific_date"
+    except ValueError:
+        sys.exit("Invalid date. Please enter dates as YYYY-MM-DD, e.g. --date 2021-03-15.")
+    if args.year is not None:
+        return dashboard.filter_by_year(df, args.year), "year"
+    return df, None
+
+# Function to get the first and last date (inclusive) of the filter given on the command line
+# (None for an open end)
+def filter_dates(args):
+    if args.start:
+        return args.start, args.end
+    if args.date:
+        return args.date, args.date
+    if args.year is not None:
+        return f"{args.year}-01-01", f"{args.year}-12-31"
+    return None, None
+
+# fetch: download (or incrementally refresh) the data of one or more countries
+def command_fetch(args):
+    dashboard = load_dashboard()
+    countries = [country.strip().lower() for country in args.country]
+    with dashboard.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        statuses = executor.map(lambda country: dashboard.update_country_data(country, force=args.force), countries)
+        failed = [country for country, status in zip(countries, statuses) if status is None]
+    for country in failed:
+        print(f"No data available for country '{country}'.", file=sys.stderr)
+    return 1 if failed else 0
+
+# ingest: stream the historical data of every country (API, URL or local file) into storage
+def command_ingest(args):
+    dashboard = load_dashboard()
+    report = dashboard.ingest_all_countries(args.source, args.lastdays)
+    print(f"{len(report)} countries stored ({sum(report.values()):,} days).")
+    return 0
+
+# query: print the filtered rows (or their totals) of a country
+def command_query(args):
+    dashboard = load_dashboard()
+    df, _ = load_filtered(dashboard, args)
+    if args.totals:
+        # Totals of the stored data from the prefix sums, for the days the filter selected
+        totals = dashboard.aggregate(args.country.strip().lower(), *filter_dates(args))
+        for metric, total in totals.items():
+            print(f"{metric}: {total:,}")
+    else:
+        df.to_csv(sys.stdout, index=False)
+    return 0
+
+# export: write the filtered rows of a country to a CSV file
+def command_export(args):
+    dashboard = load_dashboard()
+    df, _ = load_filtered(dashboard, args)
+    file_name = args.output or f"{args.country.strip().lower()}_covid_export.csv"
+    df.to_csv(file_name, index=False)
+    print(f"{len(df)} rows written to {file_name}.")
+    return 0
+
+# plot: render the chart of a country to an image file with the non-interactive Agg backend
+def command_plot(args):
+    import matplotlib
+    matplotlib.use("Agg")
+    dashboard = load_dashboard()
+    df, dashboard.filter_type = load_filtered(dashboard, args)
+    if df.empty:
+        print("No data available to plot.", file=sys.stderr)
+        return 1
+    dashboard.plot_covid_trends(df, "COVID-19 Data", args.country.strip(), save_path=args.output)
+    print(f"Chart written to {args.output}.")
+    return 0
+
+# compare: rank countries by one metric and optionally plot them as an overlay
+def command_compare(args):
+    dashboard = load_dashboard()
+    countries = [country.strip().lower() for country in args.country]
+    if args.all_countries:
+        countries = sorted(set(countries) | set(dashboard.list_stored_countries()))
+    if not countries:
+        sys.exit("Please give --country or --all-countries.")
+    populations = None
+    if args.populations:
+        with open(args.populations) as populations_file:
+            populations = {country.lower(): value for country, value in json.load(populations_file).items()}
+    elif args.per_capita and not dashboard.COUNTRY_POPULATIONS:
+        # Without a populations file the populations come from the latest snapshot of every country
+        try:
+            populations = dashboard.snapshot_populations()
+        except (OSError, ValueError) as e:
+            sys.exit(f"--per-capita needs populations: give --populations or make the snapshot endpoint reachable ({e}).")
+
+    try:
+        countries, dates, values = dashboard.compare_countries(
+            countries, args.metric, args.start, args.end, args.view, args.per_capita, args.normalize, populations)
+    except ValueError:
+        sys.exit("Invalid date. Please enter dates as YYYY-MM-DD, e.g. --start 2021-03-15.")
+    if args.per_capita:
+        missing = [country for country in countries
+                   if country not in (dashboard.COUNTRY_POPULATIONS if populations is None else populations)]
+        if missing:
+            print(f"No population for: {', '.join(missing)}", file=sys.stderr)
+    ranking = dashboard.rank_countries(countries, values)
+    print(ranking.head(args.top).to_string(index=False))
+    if args.output:
+        import matplotlib
+        matplotlib.use("Agg")
+        title = f"COVID-19 {args.metric.title()} ({args.view}{', per 100k' if args.per_capita else ''})"
+        dashboard.plot_country_comparison(countries, dates, values, title, args.top, save_path=args.output)
+        print(f"Chart written to {args.output}.")
+    return 0
+
+# latest: print today's totals of a country or a ranking of all countries from the snapshot endpoint
+def command_latest(args):
+    dashboard = load_dashboard()
+    if args.country:
+        totals = dashboard.latest_totals(args.country, args.source)
+        if totals is None:
+            print(f"No snapshot data for '{args.country}'.", file=sys.stderr)
+            return 1
+        for field, value in totals.items():
+            print(f"{field}: {value:,}" if isinstance(value, (int, float)) else f"{field}: {value}")
+        return 0
+    print(dashboard.snapshot_ranking(args.rank, args.top, args.source).to_string(index=False))
+    return 0
+
+# share: export every stored country into the memory-mapped dataset shared by all processes
+def command_share(args):
+    dashboard = load_dashboard()
+    path = dashboard.export_shared_dataset(args.country or None)
+    dataset = dashboard.open_shared_dataset()
+    print(f"{len(dataset['countries'])} countries x {len(dataset['days'])} days written to {path}.")
+    return 0
+
+# memory: report the in-memory size of each stored country
+def command_memory(args):
+    dashboard = load_dashboard()
+    report = dashboard.memory_report(args.country or None)
+    print(report.to_string(index=False))
+    print(f"Total: {report['bytes'].sum():,} bytes for {report['rows'].sum():,} rows")
+    return 0
+
+# Function to build the command-line parser
+def build_parser():
+    parser = argparse.ArgumentParser(prog="covid_dash.py", description="COVID-19 Data Dashboard without the GUI.")
+    parser.add_argument("--timing", action="store_true", help="Print the total run time to stderr")
+    parser.add_argument("--telemetry", metavar="FILE", help="Log every instrumented stage as a JSON line to FILE")
+    parser.add_argument("--metrics", action="store_true", help="Print a Prometheus snapshot of the stages to stderr")
+    parser.add_argument("--profile", metavar="DIR", help="Write a cProfile dump of every stage to DIR")
+    parser.add_argument("--shared", action="store_true", help="Read countries from the shared dataset (see share)")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = subcommands.add_parser("fetch", help="Download or refresh country data")
+    fetch.add_argument("--country", action="append", required=True, help="Country name (repeat for several)")
+    fetch.add_argument("--force", action="store_true", help="Refresh even if the stored data is still fresh")
+    fetch.add_argument("--concurrency", type=int, default=8, help="Countries fetched in parallel")
+    fetch.set_defaults(handler=command_fetch)
+
+    ingest = subcommands.add_parser("ingest", help="Stream the data of every country in one request")
+    ingest.add_argument("--source", help="URL or local JSON file with the all-countries payload (default: the API)")
+    ingest.add_argument("--lastdays", default="all", help="Days to download from the API (default: all)")
+    ingest.set_defaults(handler=command_ingest)
+
+    query = subcommands.add_parser("query", help="Print stored data as CSV")
+    add_filter_arguments(query)
+    query.add_argument("--totals", action="store_true", help="Print only the totals of the filtered rows")
+    query.set_defaults(handler=command_query)
+
+    export = subcommands.add_parser("export", help="Write stored data to a CSV file")
+    add_filter_arguments(export)
+    export.add_argument("--output", help="CSV file name (default: {country}_covid_export.csv)")
+    export.set_defaults(handler=command_export)
+
+    plot = subcommands.add_parser("plot", help="Render a chart to an image file")
+    add_filter_arguments(plot)
+    plot.add_argument("--output", required=True, help="Image file name, e.g. chart.png or chart.svg")
+    plot.set_defaults(handler=command_plot)
+
+    compare = subcommands.add_parser("compare", help="Rank and overlay several countries")
+    compare.add_argument("--country", action="append", default=[], help="Country name (repeat for several)")
+    compare.add_argument("--all-countries", action="store_true", help="Compare every country with stored data")
+    compare.add_argument("--metric", default="cases", choices=["cases", "deaths", "recovered", "vaccinations"],
+                         help="Counter to compare")
+    compare.add_argument("--view", default="total", choices=["total", "daily"], help="Cumulative totals or new per day")
+    compare.add_argument("--per-capita", action="store_true", help="Divide by the population (per 100,000 people)")
+    compare.add_argument("--normalize", action="store_true", help="Scale every country to its own peak")
+    compare.add_argument("--populations", help="JSON file mapping country names to populations "
+                         "(default for --per-capita: the populations of the latest snapshot)")
+    compare.add_argument("--start", help="Start date (YYYY-MM-DD)")
+    compare.add_argument("--end", help="End date (YYYY-MM-DD)")
+    compare.add_argument("--top", type=int, default=10, help="Countries listed and highlighted")
+    compare.add_argument("--output", help="Image file for the overlay chart")
+    compare.set_defaults(handler=command_compare)
+
+    latest = subcommands.add_parser("latest", help="Latest totals of one or all countries (one request)")
+    latest.add_argument("--country", help="Country name or ISO code (default: rank all countries)")
+    latest.add_argument("--rank", default="cases", help="Field to rank by, e.g. deaths or casesPerOneMillion")
+    latest.add_argument("--top", type=int, default=20, help="Countries listed in the ranking")
+    latest.add_argument("--source", help="URL or local JSON file with the /countries payload (default: the API)")
+    latest.set_defaults(handler=command_latest)
+
+    share = subcommands.add_parser("share", help="Export the memory-mapped dataset shared by all processes")
+    share.add_argument("--country", action="append", help="Country name (default: all stored countries)")
+    share.set_defaults(handler=command_share)
+
+    memory = subcommands.add_parser("memory", help="Report memory used per country")
+    memory.add_argument("--country", action="append", help="Country name (default: all stored countries)")
+    memory.set_defaults(handler=command_memory)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.telemetry or args.metrics or args.profile:
+        import covid_telemetry
+        covid_telemetry.enable(args.telemetry, args.profile)
+    if args.shared:
+        load_dashboard().SHARED_DATASET = True
+    exit_code = args.handler(args)
+    if args.metrics:
+        print(covid_telemetry.prometheus_snapshot(), end="", file=sys.stderr)
+    if args.timing:
+        print(f"Finished in {(time.perf_counter() - START_TIME) * 1000:.0f} ms", file=sys.stderr)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# Local HTTP/JSON query service over the stored COVID-19 data (asyncio, standard library only)
+# Usage:
+#   python covid_query_service.py --port 8080
+#   python covid_query_service.py --load-test /countries/india/totals --requests 20000 --concurrency 50
+# Endpoints:
+#   GET /countries                                               -> stored country names
+#   GET /countries/{country}/series?start=&end=&metrics=a,b      -> daily values as columns
+#   GET /countries/{country}/totals?start=&end=                  -> totals of the date window
+#   GET /metrics                                                 -> Prometheus snapshot (with --telemetry)
+# Responses carry an ETag (If-None-Match gives 304 Not Modified) and are gzip-compressed
+# when the client accepts it. Loaded frames (dashboard.get_country_frame) and rendered
+# responses are kept in memory.
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import covid_telemetry as telemetry
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+
+RESPONSE_CACHE_SIZE = 1024  # Rendered responses kept in memory (least recently used are dropped)
+GZIP_MIN_BYTES = 1024  # Smaller bodies are sent uncompressed
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+COUNTRY_ROUTE = re.compile(r"^/countries/([^/]+)/(series|totals)$")
+
+response_cache = OrderedDict()  # (path, query, data mtime) -> {"etag", "body", "gzip"}
+
+# Function to build the JSON document for a country endpoint (runs in a worker thread)
+def render_country(country, endpoint, params):
+    df = dashboard.get_country_frame(country)
+    if df is None:
+        return 404, {"error": f"No stored data for {country}"}
+    start_date = params.get("start")
+    end_date = params.get("end")
+    if start_date or end_date:
+        df = dashboard.filter_by_date_range(df, start_date or df['date'].iloc[0], end_date or df['date'].iloc[-1])
+
+    if endpoint == "totals":
+        totals = dashboard.aggregate(country, start_date or None, end_date or None)  # O(1) from the prefix sums of the country
+        return 200, {"country": country, "start": start_date, "end": end_date, "totals": totals}
+
+    metrics = params["metrics"].split(",") if params.get("metrics") else dashboard.METRICS
+    unknown = set(metrics) - set(dashboard.METRICS)
+    if unknown:
+        return 400, {"error": f"Unknown metrics: {', '.join(sorted(unknown))}"}
+    document = {"country": country,
+                "dates": np.datetime_as_string(df['date'].to_numpy(dtype='datetime64[D]')).tolist()}
+    for metric in metrics:
+        document[metric] = df[metric].tolist()  # Missing days (<NA>) become null in the JSON
+    return 200, document
+
+# Function to answer one request. Returns (status, headers, body).
+async def respond(method, target, headers):
+    if method != "GET":
+        return json_response(405, {"error": "Only GET is supported"})
+    url = urlsplit(target)
+    params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+    if url.path == "/metrics":
+        return 200, {"Content-Type": "text/plain; version=0.0.4"}, telemetry.prometheus_snapshot().encode()
+
+    if url.path == "/countries":
+        loop = asyncio.get_running_loop()
+        return json_response(200, {"countries": await loop.run_in_executor(None, dashboard.list_stored_countries)})
+
+    match = COUNTRY_ROUTE.match(url.path)
+    if match is None:
+        return json_response(404, {"error": f"Unknown path {url.path}"})
+    country, endpoint = unquote(match.group(1)).lower(), match.group(2)  # /countries/south%20africa/...
+    if not dashboard.country_data_exists(country):
+        return json_response(404, {"error": f"No stored data for {country}"})
+
+    # The ETag only depends on the request and the version of the stored data,
+    # so a matching If-None-Match is answered without touching the data at all
+    mtime = dashboard.country_data_mtime(country)
+    key = (url.path, tuple(sorted(params.items())), mtime)
+    etag = '"' + hashlib.sha1(repr(key).encode()).hexdigest()[:20] + '"'
+    if headers.get("if-none-match") == etag:
+        return 304, {"ETag": etag}, b""
+
+    cached = response_cache.get(key)
+    if cached is None:
+        loop = asyncio.get_running_loop()
+        try:
+            status, document = await loop.run_in_executor(None, render_country, country, endpoint, params)
+        except ValueError as e:
+            return json_response(400, {"error": str(e)})
+        if status != 200:
+            return json_response(status, document)
+        body = json.dumps(document, separators=(",", ":"), default=lambda value: None).encode()
+        cached = {"etag": etag, "body": body, "gzip": None}
+        response_cache[key] = cached
+        if len(response_cache) > RESPONSE_CACHE_SIZE:
+            response_cache.popitem(last=False)
+    response_cache.move_to_end(key)
+
+    response_headers = {"Content-Type": "application/json", "ETag": etag, "Cache-Control": "no-cache",
+                        "Vary": "Accept-Encoding"}
+    body = cached["body"]
+    if "gzip" in headers.get("accept-encoding", "") and len(body) >= GZIP_MIN_BYTES:
+        if cached["gzip"] is None:
+            cached["gzip"] = gzip.compress(body, compresslevel=6)
+        body = cached["gzip"]
+        response_headers["Content-Encoding"] = "gzip"
+    return 200, response_headers, body
+
+# Function to build an uncached JSON response
+def json_response(status, document):
+    return status, {"Content-Type": "application/json"}, json.dumps(document).encode()
+
+# Function to serve one client connection (HTTP/1.1 with keep-alive)
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if headers.get("content-length"):
+                await reader.readexactly(int(headers["content-length"]))
+
+            status, response_headers, body = await respond(method, target, headers)
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            response_headers["Content-Length"] = str(len(body))
+            response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+            head = f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n" + "".join(
+                f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+# Function to start the service; returns the asyncio server (its port is in server.sockets[0])
+async def start_service(host="127.0.0.1", port=8080):
+    return await asyncio.start_server(handle_connection, host, port)
+
+# Function to hammer one path with keep-alive connections and report the request rate
+async def load_test(host, port, path, total=10000, concurrency=50):
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n".encode()
+    remaining = [total]
+    statuses = {}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            writer.write(request)
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            statuses[status] = statuses.get(status, 0) + 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    print(f"{total} requests in {seconds:.2f} s ({total / seconds:,.0f} requests/s), statuses: {statuses}")
+
+async def main(args):
+    server = await start_service(args.host, args.port)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        if args.load_test:
+            await load_test(args.host, port, args.load_test, args.requests, args.concurrency)
+            return
+        print(f"Serving COVID-19 data on http://{args.host}:{port}")
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve stored COVID-19 data over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (0 picks a free one)")
+    parser.add_argument("--load-test", metavar="PATH", help="Start on a free port, load-test PATH and exit")
+    parser.add_argument("--requests", type=int, default=10000, help="Requests sent by --load-test")
+    parser.add_argument("--concurrency", type=int, default=50, help="Connections used by --load-test")
+    parser.add_argument("--telemetry", action="store_true", help="Record stage timings for GET /metrics")
+    parser.add_argument("--shared", action="store_true", help="Serve countries from the shared memory-mapped dataset")
+    args = parser.parse_args()
+    dashboard.SHARED_DATASET = args.shared
+    if args.telemetry:
+        telemetry.enable()
+    if args.load_test:
+        args.port = 0
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
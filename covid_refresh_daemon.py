@@ -0,0 +1,141 @@
+# Background service that keeps the stored data of a watch-list of countries up to date
+# Usage examples:
+#   python covid_refresh_daemon.py --country india --country usa --interval 3600 --workers 4 --rate 5
+#   python covid_refresh_daemon.py --watch-list countries.txt --once
+#   python covid_refresh_daemon.py --all-stored --interval 21600
+# Every country is refreshed once per interval (failed ones again after --retry-delay) on a pool of
+# worker threads, with at most --rate API requests per second across all workers. Stored data is
+# replaced atomically, and the last attempt and last success of every country are kept in
+# refresh_state.json in the data folder.
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+STATE_FILE = "refresh_state.json"
+RETRY_DELAY = 300  # Seconds before a failed country is tried again
+
+# Function to read a watch-list file (one country per line, "#" starts a comment)
+def load_watch_list(path):
+    countries = []
+    with open(path) as watch_file:
+        for line in watch_file:
+            country = line.split("#")[0].strip().lower()
+            if country and country not in countries:
+                countries.append(country)
+    return countries
+
+# Function to load the refresh state {country: {"last_attempt", "last_success", "status", "error"}}
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as state_file:
+        return json.load(state_file)
+
+# Function to save the refresh state atomically (temporary file + rename)
+def save_state(state, path):
+    temporary = f"{path}.tmp-{os.getpid()}"
+    with open(temporary, "w") as state_file:
+        json.dump(state, state_file, indent=2, sort_keys=True)
+    os.replace(temporary, path)
+
+# Function to get the time at which a country is next due for a refresh
+def next_due(country, state, interval, retry_delay=RETRY_DELAY):
+    entry = state.get(country)
+    if entry is None or entry.get("last_attempt") is None:
+        return 0.0
+    if entry.get("status") == "failed":
+        return entry["last_attempt"] + min(retry_delay, interval)
+    return (entry.get("last_success") or entry["last_attempt"]) + interval
+
+# Function to list the countries of the watch-list that are due at `now`
+def due_countries(watch_list, state, now, interval, retry_delay=RETRY_DELAY):
+    return [country for country in watch_list if next_due(country, state, interval, retry_delay) <= now]
+
+# Function to refresh countries on a pool of worker threads and record the outcome in the state.
+# refresh(country) returns a status ("created", "updated", "fresh") or None when the download failed.
+def refresh_countries(countries, state, refresh, clock=time.time, workers=4):
+    def refresh_one(country):
+        try:
+            return refresh(country), None
+        except Exception as e:
+            return None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(refresh_one, countries))
+    now = clock()
+    for country, (status, error) in zip(countries, outcomes):
+        entry = state.setdefault(country, {"last_success": None})
+        entry["last_attempt"] = now
+        if status is None:
+            entry["status"] = "failed"
+            entry["error"] = error or "download failed"
+        else:
+            entry["status"] = status
+            entry["error"] = None
+            entry["last_success"] = now
+    return outcomes
+
+# Function to run the refresh loop until stop is set (or for max_cycles cycles).
+# clock and sleep can be replaced by a fake clock in tests; refresh defaults to a forced
+# dashboard.update_country_data, which downloads only the days after the last stored one.
+def run_daemon(watch_list, interval, state_path, refresh=None, workers=4, clock=time.time, sleep=None,
+               stop=None, max_cycles=None, retry_delay=RETRY_DELAY, log=print):
+    stop = stop or threading.Event()
+    sleep = sleep or stop.wait
+    if refresh is None:
+        import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+        refresh = lambda country: dashboard.update_country_data(country, force=True)
+    state = load_state(state_path)
+    cycles = 0
+    while not stop.is_set() and (max_cycles is None or cycles < max_cycles):
+        due = due_countries(watch_list, state, clock(), interval, retry_delay)
+        if due:
+            refresh_countries(due, state, refresh, clock, workers)
+            save_state(state, state_path)
+            failed = [country for country in due if state[country]["status"] == "failed"]
+            log(f"Refreshed {len(due) - len(failed)} of {len(due)} countries"
+                + (f" (failed: {', '.join(failed)})" if failed else ""))
+        cycles += 1
+        if max_cycles is not None and cycles >= max_cycles:
+            break
+        wake = min((next_due(country, state, interval, retry_delay) for country in watch_list), default=clock() + interval)
+        sleep(max(wake - clock(), 1.0))
+    return state
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the stored COVID-19 data of a watch-list up to date.")
+    parser.add_argument("--country", action="append", default=[], help="Country to watch (repeat for several)")
+    parser.add_argument("--watch-list", help="File with one country per line")
+    parser.add_argument("--all-stored", action="store_true", help="Watch every country that has stored data")
+    parser.add_argument("--interval", type=float, default=3600, help="Seconds between refreshes of a country")
+    parser.add_argument("--retry-delay", type=float, default=RETRY_DELAY, help="Seconds before retrying a failure")
+    parser.add_argument("--workers", type=int, default=4, help="Countries refreshed in parallel")
+    parser.add_argument("--rate", type=float, help="Most API requests per second across all workers")
+    parser.add_argument("--once", action="store_true", help="Refresh the due countries once and exit")
+    args = parser.parse_args(argv)
+
+    import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+    watch_list = [country.strip().lower() for country in args.country]
+    if args.watch_list:
+        watch_list += [country for country in load_watch_list(args.watch_list) if country not in watch_list]
+    if args.all_stored:
+        watch_list += [country for country in dashboard.list_stored_countries() if country not in watch_list]
+    if not watch_list:
+        parser.error("Please give --country, --watch-list or --all-stored.")
+    dashboard.API_RATE_LIMIT = args.rate
+
+    stop = threading.Event()
+    try:
+        state = run_daemon(watch_list, args.interval, os.path.join(dashboard.DATA_DIR, STATE_FILE),
+                           workers=args.workers, stop=stop, max_cycles=1 if args.once else None,
+                           retry_delay=args.retry_delay)
+    except KeyboardInterrupt:
+        stop.set()
+        return 0
+    return 1 if args.once and any(state[country]["status"] == "failed" for country in watch_list) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+# Instrumentation for the COVID-19 Data Dashboard: named spans recording durations, bytes,
+# rows and cache hits, exported as JSON lines or a Prometheus text snapshot.
+# Usage:
+#   import covid_telemetry as telemetry
+#   telemetry.enable(log_path="spans.jsonl", profile_folder="profiles")
+#   with telemetry.span("export", subject="india") as span:
+#       span.add(rows=len(df))
+#   print(telemetry.prometheus_snapshot())
+# Telemetry is off by default; a disabled span costs one flag check. It can also be switched on
+# with the environment variables COVID_TELEMETRY=1, COVID_TELEMETRY_LOG=file and
+# COVID_TELEMETRY_PROFILE_DIR=folder (e.g. for the GUI).
+import functools
+import json
+import os
+import threading
+import time
+
+COUNTERS = ("bytes", "rows", "cache_hits", "cache_misses")
+
+enabled = False
+log_file = None
+profile_dir = None
+profile_spans = None  # Span names to profile (None profiles every span while profile_dir is set)
+stats = {}  # span name -> {"count", "errors", "seconds", "max_seconds", "bytes", "rows", "cache_hits", "cache_misses"}
+lock = threading.Lock()
+profiling = threading.local()  # Only the outermost span of a thread is profiled
+
+# A timed span; counters added with span.add() are recorded when it ends
+class Span:
+    def __init__(self, name, subject=None):
+        self.name = name
+        self.subject = subject
+        self.counters = {}
+        self.profiler = None
+
+    def add(self, **counters):
+        for counter, value in counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def __enter__(self):
+        if profile_dir and (profile_spans is None or self.name in profile_spans) and not getattr(profiling, "active", False):
+            import cProfile
+            self.profiler = cProfile.Profile()
+            profiling.active = True
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            profiling.active = False
+        finish_span(self, seconds, exc_type is not None)
+        return False
+
+# A span that records nothing, handed out while telemetry is disabled
+class DisabledSpan:
+    def add(self, **counters):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+DISABLED_SPAN = DisabledSpan()
+
+# Function to start a named span (use it with `with`)
+def span(name, subject=None):
+    return Span(name, subject) if enabled else DISABLED_SPAN
+
+# Function to create the totals of a span seen for the first time
+def new_totals():
+    return dict.fromkeys(("count", "errors", "seconds", "max_seconds") + COUNTERS, 0)
+
+# Function to record the end of a span in the totals, the JSON log and the profile folder
+def finish_span(finished, seconds, failed):
+    with lock:
+        totals = stats.setdefault(finished.name, new_totals())
+        totals["count"] += 1
+        totals["errors"] += failed
+        totals["seconds"] += seconds
+        totals["max_seconds"] = max(totals["max_seconds"], seconds)
+        for counter, value in finished.counters.items():
+            totals[counter] = totals.get(counter, 0) + value
+        number = totals["count"]
+
+        if log_file is not None:
+            entry = {"time": round(time.time(), 6), "span": finished.name, "seconds": round(seconds, 6),
+                     "thread": threading.current_thread().name}
+            if finished.subject is not None:
+                entry["subject"] = finished.subject
+            if failed:
+                entry["error"] = True
+            entry.update(finished.counters)
+            log_file.write(json.dumps(entry, default=str) + "\n")
+            log_file.flush()
+
+    if finished.profiler is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        finished.profiler.dump_stats(os.path.join(profile_dir, f"{finished.name}-{number}.prof"))
+
+# Function to add counters to a span's totals without timing anything (e.g. cache lookups)
+def record(name, **counters):
+    if not enabled:
+        return
+    with lock:
+        totals = stats.setdefault(name, new_totals())
+        for counter, value in counters.items():
+            totals[counter] = totals.get(counter, 0) + value
+
+# Decorator to run a function inside a span named `name`.
+# measure(result, *args, **kwargs) can return counters for the span, e.g. {"rows": len(result)};
+# a first argument that is a string (usually the country) is logged as the subject.
+def instrument(name, measure=None):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            subject = args[0] if args and isinstance(args[0], str) else None
+            with Span(name, subject) as active:
+                result = func(*args, **kwargs)
+                if measure is not None:
+                    active.add(**measure(result, *args, **kwargs))
+            return result
+        return wrapper
+    return decorate
+
+# Function to count the rows of a returned DataFrame (for instrument)
+def count_rows(result, *args, **kwargs):
+    return {"rows": len(result)} if result is not None else {}
+
+# Function to count the rows of a DataFrame passed as the first or second argument (for instrument)
+def count_input_rows(result, *args, **kwargs):
+    frames = [arg for arg in args[:2] if hasattr(arg, "columns")]
+    return {"rows": len(frames[0])} if frames else {}
+
+# Function to switch telemetry on, optionally logging every span as a JSON line to log_path and
+# writing a cProfile dump per span (or only for the names in spans) to profile_folder
+def enable(log_path=None, profile_folder=None, spans=None):
+    global enabled, log_file, profile_dir, profile_spans
+    disable()
+    if log_path is not None:
+        log_file = open(log_path, "a")
+    profile_dir = profile_folder
+    profile_spans = set(spans) if spans else None
+    enabled = True
+
+# Function to switch telemetry off (the totals are kept until reset())
+def disable():
+    global enabled, log_file, profile_dir
+    enabled = False
+    profile_dir = None
+    if log_file is not None:
+        log_file.close()
+        log_file = None
+
+# Function to clear the totals
+def reset():
+    with lock:
+        stats.clear()
+
+# Function to get a copy of the totals of every span
+def snapshot():
+    with lock:
+        return {name: dict(totals) for name, totals in stats.items()}
+
+# Function to render the totals in the Prometheus text exposition format
+def prometheus_snapshot(prefix="covid"):
+    metrics = [("span_count_total", "count", "counter", "Number of times the span ran"),
+               ("span_errors_total", "errors", "counter", "Spans that ended with an exception"),
+               ("span_seconds_total", "seconds", "counter", "Time spent in the span"),
+               ("span_max_seconds", "max_seconds", "gauge", "Longest single run of the span"),
+               ("span_bytes_total", "bytes", "counter", "Bytes transferred or written"),
+               ("span_rows_total", "rows", "counter", "Rows processed"),
+               ("span_cache_hits_total", "cache_hits", "counter", "Cache hits"),
+               ("span_cache_misses_total", "cache_misses", "counter", "Cache misses")]
+    totals = snapshot()
+    lines = []
+    for metric, key, kind, description in metrics:
+        lines.append(f"# HELP {prefix}_{metric} {description}")
+        lines.append(f"# TYPE {prefix}_{metric} {kind}")
+        for name in sorted(totals):
+            lines.append(f'{prefix}_{metric}{{span="{name}"}} {totals[name].get(key, 0):g}')
+    return "\n".join(lines) + "\n"
+
+if os.environ.get("COVID_TELEMETRY") or os.environ.get("COVID_TELEMETRY_LOG"):
+    enable(os.environ.get("COVID_TELEMETRY_LOG"), os.environ.get("COVID_TELEMETRY_PROFILE_DIR"))
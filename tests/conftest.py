@@ -0,0 +1,112 @@
+# Shared fixtures: an isolated data folder and a local stand-in for the disease.sh API
+import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LAST_DAY = datetime.date(2023, 3, 9)
+
+# Function to build an API timeline of `days` days ending on LAST_DAY (cases grow by 10 a day)
+def make_timeline(days, vaccinated=False):
+    keys = [LAST_DAY - datetime.timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    keys = [f"{day.month}/{day.day}/{day.strftime('%y')}" for day in keys]
+    timeline = {"cases": {key: i * 10 for i, key in enumerate(keys)},
+                "deaths": {key: i for i, key in enumerate(keys)},
+                "recovered": {key: i * 5 for i, key in enumerate(keys)}}
+    if vaccinated:
+        timeline["vaccinated"] = {key: i * 3 for i, key in enumerate(keys)}
+    return timeline
+
+# Function to clear the in-memory caches of the dashboard module
+def clear_caches():
+    for cache in (dashboard.rollup_cache, dashboard.frame_cache, dashboard.derived_cache):
+        cache.clear()
+    dashboard.frame_cache_stats.update(hits=0, misses=0, evictions=0, bytes=0)
+    dashboard.snapshot.update(table=None, aliases={}, loaded_at=0.0)
+    dashboard.shared_dataset.clear()
+    dashboard.shared_dataset["version"] = None
+
+# Function to read a recorded API payload from tests/data
+def load_payload(name):
+    with open(os.path.join(DATA_FOLDER, name), "rb") as payload_file:
+        return payload_file.read()
+
+# Stand-in for the API:
+#   /historical/{country}?lastdays=K  timeline of K days (30 for "all"); "nowhere" is unknown (404)
+#                                     and "flaky" fails with 503 twice before it answers
+#   /countries                        the recorded snapshot payload in tests/data/countries.json
+# Responses carry an ETag (If-None-Match gives 304) and Cache-Control: max-age=server.max_age.
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        with server.lock:
+            server.requests.append(self.path)
+            failures = server.failures.get(url.path, 0)
+            if failures:
+                server.failures[url.path] = failures - 1
+        parts = url.path.strip("/").split("/")
+        if failures:
+            return self.send_body(503, b"")
+        if parts == ["countries"]:
+            return self.send_body(200, load_payload("countries.json"))
+        if len(parts) == 2 and parts[0] == "historical" and parts[1] != "nowhere":
+            lastdays = parse_qs(url.query).get("lastdays", ["all"])[0]
+            days = 30 if lastdays == "all" else int(lastdays)
+            return self.send_body(200, json.dumps({"country": parts[1], "timeline": make_timeline(days)}).encode())
+        self.send_body(404, b'{"message":"Country not found or doesn\'t have any historical data"}')
+
+    def send_body(self, status, body):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={self.server.max_age}")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", f"max-age={self.server.max_age}")
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def stand_in(data_dir, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.failures = {"/historical/flaky": 2}
+    server.max_age = 3600
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(dashboard, "API_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(dashboard, "BACKOFF_FACTOR", 0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(dashboard, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(dashboard, "STORAGE_FORMAT", "npy")
+    monkeypatch.setattr(dashboard, "SHARED_DATASET", False)
+    clear_caches()
+    yield tmp_path
+    clear_caches()
@@ -0,0 +1,35 @@
+import json
+import os
+
+import pytest
+
+import batch_render_charts
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+@pytest.fixture
+def india(data_dir):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(400)))
+    return dashboard.read_country_frame("india")
+
+@pytest.mark.parametrize("window, rows", [("all", 400), ("year:2023", 68), ("date:2023-03-01", 1),
+                                          ("range:2023-03-01:2023-03-09", 9), ("last:30", 30)])
+def test_windows(india, window, rows):
+    df, _ = batch_render_charts.apply_window(dashboard, india, window)
+    assert len(df) == rows
+
+@pytest.mark.parametrize("window", ["last:0", "last:-3", "week:1"])
+def test_invalid_windows(india, window):
+    with pytest.raises(ValueError):
+        batch_render_charts.apply_window(dashboard, india, window)
+
+def test_failed_windows_are_reported_in_the_manifest(india, data_dir, tmp_path):
+    output_dir = str(tmp_path / "charts")
+    entries = batch_render_charts.render_charts(["india"], ["last:7", "last:0"], output_dir, workers=1,
+                                                data_dir=dashboard.DATA_DIR, storage_format=dashboard.STORAGE_FORMAT)
+    assert [entry["file"] for entry in entries] == ["india_last_7.png", None]
+    assert "positive number of days" in entries[1]["error"]
+    assert os.path.exists(os.path.join(output_dir, "india_last_7.png"))
+    assert not os.path.exists(os.path.join(output_dir, "india_last_0.png"))
+    with open(os.path.join(output_dir, "manifest.json")) as manifest_file:
+        assert json.load(manifest_file)["charts"] == entries
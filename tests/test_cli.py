@@ -0,0 +1,47 @@
+import pytest
+
+import covid_dash
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+@pytest.fixture
+def india(data_dir):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(30)))
+
+def test_query_prints_the_filtered_rows(india, capsys):
+    assert covid_dash.main(["query", "--country", "India", "--start", "2023-03-01", "--end", "2023-03-02"]) == 0
+    assert capsys.readouterr().out.splitlines() == ["date,cases,deaths,recovered,vaccinations",
+                                                    "2023-03-01,210,21,105,", "2023-03-02,220,22,110,"]
+
+def test_query_totals(india, capsys):
+    assert covid_dash.main(["query", "--country", "india", "--year", "2023", "--totals"]) == 0
+    assert "cases: 4,350" in capsys.readouterr().out
+
+@pytest.mark.parametrize("arguments", [["--date", "2021-13-45"], ["--date", "yesterday"],
+                                       ["--start", "2021-01-01", "--end", "soon"]])
+def test_invalid_dates_exit_with_a_message(india, arguments):
+    with pytest.raises(SystemExit) as exit_info:
+        covid_dash.main(["query", "--country", "india"] + arguments)
+    assert "Invalid date" in str(exit_info.value)
+
+@pytest.mark.parametrize("arguments", [["--start", "2023-02-30"], ["--end", "soon"]])
+def test_compare_with_invalid_dates(india, arguments):
+    with pytest.raises(SystemExit) as exit_info:
+        covid_dash.main(["compare", "--country", "india"] + arguments)
+    assert "Invalid date" in str(exit_info.value)
+
+def test_compare_with_an_unknown_metric(india, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        covid_dash.main(["compare", "--country", "india", "--metric", "foo"])
+    assert exit_info.value.code == 2
+    assert "invalid choice: 'foo'" in capsys.readouterr().err
+
+def test_missing_end_date(india):
+    with pytest.raises(SystemExit) as exit_info:
+        covid_dash.main(["query", "--country", "india", "--start", "2023-03-01"])
+    assert "--end" in str(exit_info.value)
+
+def test_unknown_country(data_dir):
+    with pytest.raises(SystemExit) as exit_info:
+        covid_dash.main(["query", "--country", "atlantis"])
+    assert "No stored data for 'atlantis'" in str(exit_info.value)
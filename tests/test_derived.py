@@ -0,0 +1,63 @@
+import numpy as np
+
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+nan = np.nan
+
+def test_zeros_after_reporting_stopped_are_missing_days():
+    values = np.array([[0, 100, 500, 900, 1500, 0, 0, 0],
+                       [0, 10, nan, 30, 25, 40, 50, nan]])
+    corrected = dashboard.correct_cumulative(values)
+
+    np.testing.assert_array_equal(corrected, [[0, 100, 500, 900, 1500, nan, nan, nan],
+                                              [0, 10, nan, 30, 25, 40, 50, nan]])
+    np.testing.assert_array_equal(values[0], [0, 100, 500, 900, 1500, 0, 0, 0])  # Input left alone
+
+def test_permanent_downward_revision_keeps_the_following_days():
+    values = np.array([[1000, 1010, 1020, 1030, 1040, 1050, 950, 960, 970, 980, 990, 1000, 1060]], dtype=np.float64)
+    corrected = dashboard.correct_cumulative(values)
+    np.testing.assert_array_equal(corrected, values)
+
+    new = dashboard.daily_increase(corrected)
+    np.testing.assert_array_equal(new, [[nan, 10, 10, 10, 10, 10, 0, 10, 10, 10, 10, 10, 60]])
+    assert not np.isnan(dashboard.rolling_mean(new, 7)[0, 7:]).any()
+
+def test_daily_increase_spans_missing_days():
+    corrected = np.array([[0, 100, 500, 900, 1500, nan, nan, nan],
+                          [nan, 10, nan, 30, nan, 40, 50, nan]])
+    np.testing.assert_array_equal(dashboard.daily_increase(corrected),
+                                  [[nan, 100, 400, 400, 600, nan, nan, nan],
+                                   [nan, nan, nan, 20, nan, 10, 10, nan]])
+
+def test_short_and_empty_series():
+    assert dashboard.correct_cumulative(np.empty((0, 5))).shape == (0, 5)
+    np.testing.assert_array_equal(dashboard.correct_cumulative(np.array([[7.0]])), [[7.0]])
+    assert dashboard.daily_increase(np.empty((2, 0))).shape == (2, 0)
+
+# A timeline whose recovered counter stops being reported (drops to 0), like disease.sh since August 2021
+def stopped_recovered_timeline(days=60, reported=40):
+    timeline = make_timeline(days)
+    timeline['recovered'] = {key: (value if i < reported else 0)
+                             for i, (key, value) in enumerate(timeline['recovered'].items())}
+    return timeline
+
+def test_derived_metrics_keep_the_reported_recoveries(data_dir):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(stopped_recovered_timeline()))
+    derived = dashboard.get_derived_metrics("india")
+
+    assert (derived['new_recovered'][1:40] == 5).all()
+    assert derived['new_recovered'][40:].isna().all()
+    assert (derived['new_cases'][1:] == 10).all()
+
+def test_compare_recovered_after_reporting_stopped(data_dir):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(stopped_recovered_timeline()))
+    dashboard.write_country_frame("usa", dashboard.timeline_to_frame(make_timeline(60)))
+
+    countries, dates, totals = dashboard.compare_countries(["india", "usa"], "recovered")
+    assert countries == ["india", "usa"]
+    assert totals[0, 39] == 195 and np.isnan(totals[0, 40:]).all()
+    assert list(dashboard.rank_countries(countries, totals)['value']) == [295, 195]
+
+    _, _, daily = dashboard.compare_countries(["india"], "recovered", view="daily")
+    assert (daily[0, 7:40] == 5).all()
@@ -0,0 +1,34 @@
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+
+def test_fetch_countries_reports_each_country(stand_in):
+    report = dashboard.fetch_countries(["india", "usa", "nowhere"], max_concurrency=3, retries=0)
+
+    assert sorted(report) == ["india", "nowhere", "usa"]
+    assert len(report["india"]["timeline"]["cases"]) == 30
+    assert report["india"]["error"] is None
+    assert report["nowhere"]["timeline"] is None
+    assert "404" in report["nowhere"]["error"]
+    assert all(entry["seconds"] >= 0 for entry in report.values())
+
+def test_fetch_countries_retries_server_errors(stand_in):
+    report = dashboard.fetch_countries(["flaky"], retries=2)
+
+    assert report["flaky"]["error"] is None
+    assert stand_in.requests.count("/historical/flaky?lastdays=all") == 3
+
+def test_fetch_countries_gives_up_after_the_retries(stand_in):
+    report = dashboard.fetch_countries(["flaky"], retries=1)
+
+    assert report["flaky"]["timeline"] is None
+    assert "503" in report["flaky"]["error"]
+
+def test_fetch_countries_reports_connection_errors(data_dir, monkeypatch):
+    monkeypatch.setattr(dashboard, "API_BASE_URL", "http://127.0.0.1:9")
+    report = dashboard.fetch_countries(["india"], retries=0, timeout=2)
+
+    assert report["india"]["timeline"] is None
+    assert report["india"]["error"]
+
+def test_fetch_country_data_returns_none_for_unknown_country(stand_in):
+    assert dashboard.fetch_country_data("nowhere") is None
+    assert dashboard.fetch_country_data("india")["cases"]
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+@pytest.fixture
+def india(data_dir):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(400, vaccinated=True)))
+    return dashboard.read_country_frame("india")
+
+@pytest.mark.parametrize("storage_format", ["npy", "csv", "sqlite"])
+def test_loaded_frames_are_binary_searched(data_dir, storage_format, monkeypatch):
+    monkeypatch.setattr(dashboard, "STORAGE_FORMAT", storage_format)
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(400)))
+    df = dashboard.read_country_frame("india")
+    assert dashboard.is_sorted_by_date(df['date'].to_numpy())
+    assert dashboard.is_sorted_by_date(dashboard.filter_by_year(df, 2022)['date'].to_numpy())
+    assert not dashboard.is_sorted_by_date(df.iloc[::-1]['date'].to_numpy())
+    assert not dashboard.is_sorted_by_date(df.assign(date=df['date'] - pd.Timedelta(days=1))['date'].to_numpy())
+
+def test_filters_on_a_date_sorted_frame(india):
+    window = dashboard.filter_by_date_range(india, "2022-06-01", "2022-06-10")
+    assert len(window) == 10
+    assert window['date'].iloc[0] == pd.Timestamp("2022-06-01")
+    assert len(dashboard.filter_by_specific_date(india, "2022-06-05")) == 1
+    assert len(dashboard.filter_by_year(india, 2023)) == 68
+    assert dashboard.filter_by_date_range(india, "2019-01-01", "2019-12-31").empty
+
+@pytest.mark.parametrize("reorder", [
+    lambda df: df.sort_values('cases', ascending=False),
+    lambda df: df.sample(frac=1, random_state=1),
+    lambda df: pd.concat([df.iloc[200:], df.iloc[:200]]),
+])
+def test_filters_on_a_reordered_frame(india, reorder):
+    # These frames have their own (unmarked) date arrays, so they are filtered with a mask
+    shuffled = reorder(india)
+    assert not dashboard.is_sorted_by_date(shuffled['date'].to_numpy())
+    window = dashboard.filter_by_date_range(shuffled, "2022-06-01", "2022-06-10")
+    assert sorted(window['date']) == list(pd.date_range("2022-06-01", "2022-06-10"))
+    assert len(dashboard.filter_by_specific_date(shuffled, "2022-06-05")) == 1
+
+@pytest.mark.parametrize("filter_function, args", [
+    (dashboard.filter_by_date_range, ("2022-06-01", "2022-06-10")),
+    (dashboard.filter_by_specific_date, ("2022-06-05",)),
+    (dashboard.filter_by_year, (2022,)),
+])
+def test_filter_totals_come_from_the_prefix_sums(india, filter_function, args):
+    window, totals = dashboard.filter_and_total(filter_function, "india", india, *args)
+    assert totals == {metric: int(window[metric].sum()) for metric in dashboard.METRICS}
+    assert totals == dashboard.aggregate("india", *dashboard.filter_dates(filter_function, *args))
+
+@pytest.mark.parametrize("change", [
+    lambda df: df.assign(cases=df['cases'].astype('int64') * 2),
+    lambda df: df.iloc[::2],
+    lambda df: df[df['cases'] > 1000],
+    lambda df: df.sort_values('cases', ascending=False).iloc[:50],
+])
+def test_totals_of_other_frames_are_summed(india, change):
+    changed = change(india)
+    assert dashboard.aggregate_totals(changed) == {metric: int(changed[metric].sum()) for metric in dashboard.METRICS}
+
+def test_totals_of_a_frame_changed_in_place(data_dir, monkeypatch):
+    monkeypatch.setattr(dashboard, "STORAGE_FORMAT", "csv")
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(400)))
+    df = dashboard.read_country_frame("india")
+    df.loc[len(df) - 1, 'cases'] = 0
+    window = dashboard.filter_by_year(df, 2023)
+    assert dashboard.aggregate_totals(window)['cases'] == int(window['cases'].sum())
+
+def test_totals_of_a_frame_loaded_before_a_refresh(india):
+    window = dashboard.filter_by_date_range(india, "2022-06-01", "2022-06-10")
+    expected = {metric: int(window[metric].sum()) for metric in dashboard.METRICS}
+    timeline = make_timeline(400, vaccinated=True)
+    timeline['cases'] = {key: value * 3 for key, value in timeline['cases'].items()}
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(timeline))
+    dashboard.read_country_frame("india")
+
+    assert dashboard.aggregate_totals(window) == expected
@@ -0,0 +1,52 @@
+import os
+import time
+
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+
+def test_cached_get_hit_revalidate_and_stale(stand_in):
+    url = f"{dashboard.API_BASE_URL}/historical/india"
+    body, status = dashboard.cached_get(url, params={"lastdays": 5})
+    assert status == "miss"
+    assert dashboard.cached_get(url, params={"lastdays": 5}) == (body, "hit")
+    assert len(stand_in.requests) == 1
+
+    # An expired entry is revalidated with its ETag
+    stand_in.max_age = 0
+    dashboard.cached_get(url, params={"lastdays": 6})
+    assert dashboard.cached_get(url, params={"lastdays": 6})[1] == "revalidated"
+
+    # The stored body is served when the server fails
+    stand_in.failures["/historical/india"] = 10
+    assert dashboard.cached_get(url, params={"lastdays": 6}, retries=0)[1] == "stale"
+
+def test_cached_get_without_cache(stand_in, monkeypatch):
+    monkeypatch.setattr(dashboard, "HTTP_CACHE_DIR", None)
+    url = f"{dashboard.API_BASE_URL}/historical/india"
+    assert dashboard.cached_get(url)[1] == "miss"
+    assert dashboard.cached_get(url)[1] == "miss"
+    assert not os.path.exists(os.path.join(dashboard.DATA_DIR, "http_cache"))
+
+def test_request_country_frame_reuses_normalized_arrays(stand_in):
+    first = dashboard.request_country_frame("india", lastdays=10)
+    second = dashboard.request_country_frame("india", lastdays=10)
+    assert len(stand_in.requests) == 1
+    assert first.equals(second)
+    assert len(first) == 10
+
+def test_incremental_windows_are_pruned(stand_in, monkeypatch):
+    monkeypatch.setattr(dashboard, "HTTP_CACHE_MAX_ENTRIES", 3)
+    for lastdays in range(1, 8):
+        dashboard.request_country_frame("india", lastdays=lastdays)
+
+    folder = os.path.join(dashboard.DATA_DIR, dashboard.HTTP_CACHE_DIR)
+    assert len([name for name in os.listdir(folder) if name.endswith(".json")]) == 3
+    assert len(os.listdir(folder)) == 9  # .json, .body and .npz of each entry
+    # The newest windows are kept
+    assert dashboard.cached_get(f"{dashboard.API_BASE_URL}/historical/india", params={"lastdays": 7})[1] == "hit"
+
+def test_old_entries_expire(stand_in):
+    dashboard.request_country_frame("india", lastdays=3)
+    folder = os.path.join(dashboard.DATA_DIR, dashboard.HTTP_CACHE_DIR)
+    assert dashboard.prune_http_cache() == 1
+    assert dashboard.prune_http_cache(time.time() + dashboard.HTTP_CACHE_MAX_AGE_SECONDS + 1) == 0
+    assert os.listdir(folder) == []
@@ -0,0 +1,64 @@
+import asyncio
+import gzip
+import http.client
+import json
+from collections import OrderedDict
+
+import pytest
+
+import covid_query_service
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+@pytest.fixture
+def stored(data_dir, monkeypatch):
+    monkeypatch.setattr(covid_query_service, "response_cache", OrderedDict())
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(400)))
+    dashboard.write_country_frame("south africa", dashboard.timeline_to_frame(make_timeline(30)))
+
+# Function to send one GET request to the service; returns (status, headers, body)
+def get(port, path, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request("GET", path, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, {name.lower(): value for name, value in response.getheaders()}, response.read()
+    finally:
+        connection.close()
+
+# Function to start the service on a free port and send it a list of (path, headers) requests in order
+def serve(*requests):
+    async def scenario():
+        server = await covid_query_service.start_service(port=0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            loop = asyncio.get_running_loop()
+            return [await loop.run_in_executor(None, get, port, path, headers) for path, headers in requests]
+    return asyncio.run(scenario())
+
+def test_totals_and_not_modified(stored):
+    path = "/countries/india/totals?start=2023-03-01&end=2023-03-02"
+    [(status, headers, body)] = serve((path, None))
+    assert status == 200
+    assert json.loads(body)["totals"]["cases"] == 3910 + 3920
+
+    revalidated, stale = serve((path, {"If-None-Match": headers["etag"]}), (path, {"If-None-Match": '"other"'}))
+    assert revalidated[0] == 304 and revalidated[2] == b""
+    assert stale[0] == 200
+
+def test_series_is_gzipped(stored):
+    [(status, headers, body)] = serve(("/countries/india/series?metrics=cases", {"Accept-Encoding": "gzip"}))
+    assert status == 200 and headers["content-encoding"] == "gzip"
+    document = json.loads(gzip.decompress(body))
+    assert len(document["dates"]) == len(document["cases"]) == 400
+
+def test_bad_requests(stored):
+    responses = serve(("/countries/india/totals?start=2023-02-30", None), ("/countries/india/series?metrics=flags", None),
+                      ("/countries/atlantis/totals", None), ("/weather", None))
+    assert [status for status, _, _ in responses] == [400, 400, 404, 404]
+
+def test_country_names_are_url_decoded(stored):
+    [(status, _, body)] = serve(("/countries/South%20Africa/totals", None))
+    assert status == 200
+    assert json.loads(body)["country"] == "south africa"
+    assert json.loads(body)["totals"]["cases"] == sum(range(0, 300, 10))
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+
+import pytest
+
+import covid_refresh_daemon as daemon
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+# A clock that only moves when the daemon sleeps
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+# A refresh function that records its calls and fails for the countries in `failing`
+class RecordingRefresh:
+    def __init__(self, clock, failing=()):
+        self.clock = clock
+        self.failing = set(failing)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, country):
+        with self.lock:
+            self.calls.append((self.clock(), country))
+        if country in self.failing:
+            raise RuntimeError("stand-in failure")
+        return "updated"
+
+def test_run_daemon_refreshes_every_interval(tmp_path):
+    clock = FakeClock()
+    refresh = RecordingRefresh(clock)
+    state_path = str(tmp_path / "state.json")
+    daemon.run_daemon(["india", "usa"], 100, state_path, refresh=refresh, clock=clock, sleep=clock.sleep,
+                      max_cycles=3, log=lambda message: None)
+
+    start = 1_000_000.0
+    assert sorted(refresh.calls) == [(start, "india"), (start, "usa"), (start + 100, "india"),
+                                     (start + 100, "usa"), (start + 200, "india"), (start + 200, "usa")]
+    assert clock.sleeps == [100, 100]
+    with open(state_path) as state_file:
+        state = json.load(state_file)
+    assert state["india"] == {"last_attempt": start + 200, "last_success": start + 200,
+                              "status": "updated", "error": None}
+
+def test_failed_country_is_retried_after_retry_delay(tmp_path):
+    clock = FakeClock()
+    refresh = RecordingRefresh(clock, failing={"usa"})
+    state = daemon.run_daemon(["india", "usa"], 100, str(tmp_path / "state.json"), refresh=refresh, clock=clock,
+                              sleep=clock.sleep, max_cycles=3, retry_delay=10, log=lambda message: None)
+
+    start = 1_000_000.0
+    assert sorted(refresh.calls) == [(start, "india"), (start, "usa"), (start + 10, "usa"), (start + 20, "usa")]
+    assert state["usa"]["status"] == "failed"
+    assert state["usa"]["error"] == "stand-in failure"
+    assert state["usa"]["last_success"] is None
+    assert state["india"]["last_success"] == start
+
+def test_run_daemon_resumes_from_saved_state(tmp_path):
+    clock = FakeClock()
+    state_path = str(tmp_path / "state.json")
+    daemon.save_state({"india": {"last_attempt": clock() - 30, "last_success": clock() - 30,
+                                 "status": "updated", "error": None}}, state_path)
+    refresh = RecordingRefresh(clock)
+    daemon.run_daemon(["india"], 100, state_path, refresh=refresh, clock=clock, sleep=clock.sleep,
+                      max_cycles=2, log=lambda message: None)
+
+    # Only due 100 seconds after the saved success
+    assert refresh.calls == [(clock.now, "india")]
+    assert clock.sleeps == [70]
+
+def test_stop_event_ends_the_loop(tmp_path):
+    stop = threading.Event()
+    clock = FakeClock()
+
+    def refresh(country):
+        stop.set()
+        return "fresh"
+
+    state = daemon.run_daemon(["india"], 100, str(tmp_path / "state.json"), refresh=refresh, clock=clock,
+                              sleep=clock.sleep, stop=stop, log=lambda message: None)
+    assert state["india"]["status"] == "fresh"
+    assert clock.sleeps == [100]
+
+def test_load_watch_list(tmp_path):
+    path = tmp_path / "countries.txt"
+    path.write_text("India\n# a comment\nusa  # United States\n\nindia\n")
+    assert daemon.load_watch_list(str(path)) == ["india", "usa"]
+
+def test_daemon_stores_data_from_stand_in(stand_in, data_dir):
+    clock = FakeClock()
+    state_path = str(data_dir / daemon.STATE_FILE)
+    state = daemon.run_daemon(["india", "nowhere"], 100, state_path, clock=clock, sleep=clock.sleep,
+                              max_cycles=1, log=lambda message: None)
+
+    assert state["india"]["status"] == "created"
+    assert state["nowhere"]["status"] == "failed"
+    assert len(dashboard.read_country_frame("india")) == 30
+
+    # A second cycle downloads only the recent days and merges them in
+    state = daemon.run_daemon(["india"], 100, state_path, clock=FakeClock(clock.now + 100), max_cycles=1,
+                              log=lambda message: None)
+    assert state["india"]["status"] == "updated"
+    assert any("lastdays=" in request and "lastdays=all" not in request for request in stand_in.requests)
+
+# The writes the daemon makes must not disturb readers or other tools working on DATA_DIR
+
+def test_rewrites_keep_data_dir_clean(data_dir, monkeypatch):
+    frame = dashboard.timeline_to_frame(make_timeline(40))
+    for _ in range(3):
+        dashboard.write_country_frame("india", frame)
+        dashboard.write_country_frame("usa", frame)
+
+    assert sorted(os.listdir(data_dir)) == [dashboard.VERSIONS_DIR, "india_covid_data", "usa_covid_data"]
+    assert len(os.listdir(data_dir / dashboard.VERSIONS_DIR)) == 2
+    monkeypatch.setattr(dashboard, "STORAGE_FORMAT", "sqlite")
+    assert dashboard.build_database() == ["india", "usa"]
+
+def test_concurrent_writers_leave_one_version(data_dir):
+    frame = dashboard.timeline_to_frame(make_timeline(40))
+    writers = [threading.Thread(target=lambda: [dashboard.write_country_frame("india", frame) for _ in range(10)])
+               for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert os.listdir(data_dir / dashboard.VERSIONS_DIR) == [os.path.basename(os.path.realpath(data_dir / "india_covid_data"))]
+    assert len(dashboard.read_country_frame("india")) == 40
+
+@pytest.mark.parametrize("symlinks", [True, False])
+def test_readers_always_see_a_complete_version(data_dir, monkeypatch, symlinks):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(40)))
+    if not symlinks:
+        def no_symlinks(*args, **kwargs):
+            raise OSError("symlinks are not available")
+        monkeypatch.setattr(os, "symlink", no_symlinks)
+    frames = [dashboard.timeline_to_frame(make_timeline(days)) for days in (40, 50)]
+    done = threading.Event()
+    problems = []
+
+    def reader():
+        while not done.is_set():
+            try:
+                df = dashboard.read_country_frame("india", mmap=False)
+                if df is None or len(df) not in (40, 50) or int(df['cases'].iloc[-1]) != (len(df) - 1) * 10:
+                    problems.append(df)
+            except Exception as e:
+                problems.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in readers:
+        thread.start()
+    for i in range(60):
+        dashboard.write_country_frame("india", frames[i % 2])
+    done.set()
+    for thread in readers:
+        thread.join()
+    assert problems == []
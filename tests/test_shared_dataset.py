@@ -0,0 +1,75 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import covid_dash
+import covid_query_service
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+@pytest.fixture
+def exported(data_dir):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(40, vaccinated=True)))
+    dashboard.write_country_frame("usa", dashboard.timeline_to_frame(make_timeline(20)))
+    return dashboard.export_shared_dataset()
+
+def test_shared_frames_match_the_stored_ones(exported):
+    for country in ("india", "usa"):
+        shared = dashboard.shared_country_frame(country)
+        stored = dashboard.read_country_frame(country)
+        assert list(shared.columns) == list(stored.columns)
+        pd.testing.assert_frame_equal(shared.astype({metric: "Int64" for metric in dashboard.METRICS}),
+                                      stored.astype({metric: "Int64" for metric in dashboard.METRICS}))
+
+def test_shared_frames_are_integer_and_zero_copy(exported):
+    usa = dashboard.shared_country_frame("usa")
+    assert usa['cases'].dtype == np.int64
+    assert isinstance(usa['vaccinations'].dtype, pd.Int64Dtype)  # Never reported: all <NA>
+    assert usa['vaccinations'].isna().all()
+    values = dashboard.shared_dataset["values"]
+    assert np.shares_memory(usa['cases'].to_numpy(), values)
+    assert np.shares_memory(usa['vaccinations'].array._data, values)
+
+def test_shared_slices_are_totalled_from_the_prefix_sums(exported):
+    usa = dashboard.shared_country_frame("usa")
+    window, totals = dashboard.filter_and_total(dashboard.filter_by_date_range, "usa", usa, "2023-03-01", "2023-03-05")
+    assert dashboard.rollup_cache["usa"]["prefix"].base is not None  # A view of the mapped prefix sums
+    assert totals == {"cases": 650, "deaths": 65, "recovered": 325, "vaccinations": 0}
+    assert totals == dashboard.aggregate_totals(window)
+
+def test_shared_service_response_is_valid_json(exported, monkeypatch):
+    monkeypatch.setattr(dashboard, "SHARED_DATASET", True)
+    status, document = covid_query_service.render_country("usa", "series", {})
+    assert status == 200
+    body = json.dumps(document, default=lambda value: None, allow_nan=False)
+    assert json.loads(body)["vaccinations"][:2] == [None, None]
+    assert json.loads(body)["cases"][:3] == [0, 10, 20]
+
+def test_shared_query_prints_integers(exported, capsys):
+    assert covid_dash.main(["--shared", "query", "--country", "usa", "--date", "2023-03-09"]) == 0
+    assert capsys.readouterr().out.splitlines()[1] == "2023-03-09,190,19,95,"
+
+def test_export_of_no_countries(data_dir):
+    path = dashboard.export_shared_dataset([])
+    dataset = dashboard.open_shared_dataset()
+    assert path == os.path.join(str(data_dir), dashboard.SHARED_DATASET_NAME)
+    assert dataset["countries"] == []
+    assert dataset["values"].shape == (0, 0, len(dashboard.METRICS))
+
+def test_failed_export_leaves_nothing_behind(exported, monkeypatch):
+    published = os.path.realpath(exported)
+
+    def failing_write(folder, *args):
+        open(os.path.join(folder, "values.npy"), "wb").close()
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(dashboard, "write_shared_dataset", failing_write)
+    with pytest.raises(OSError):
+        dashboard.export_shared_dataset()
+    versions = os.listdir(os.path.join(dashboard.DATA_DIR, dashboard.VERSIONS_DIR))
+    assert sorted(name for name in versions if name.startswith(dashboard.SHARED_DATASET_NAME)) == [
+        os.path.basename(published)]
+    assert os.path.realpath(exported) == published
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import covid_dash
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import DATA_FOLDER, make_timeline
+
+PAYLOAD = os.path.join(DATA_FOLDER, "countries.json")
+
+def test_load_snapshot_from_payload(data_dir):
+    table = dashboard.load_snapshot(PAYLOAD)
+
+    assert list(table.index) == ["india", "usa", "germany", "côte d'ivoire", "diamond princess"]
+    assert table.loc["india", "cases"] == 44690738
+    assert table.loc["germany", "population"] == 83883596
+    assert str(table.loc["usa", "updated"]) == "2023-03-10 00:00:00"
+    assert table.loc["usa", "continent"] == "North America"
+    assert dashboard.snapshot["aliases"]["ind"] == "india"
+    assert dashboard.snapshot["aliases"]["us"] == "usa"
+
+def test_load_snapshot_is_reused_until_it_expires(data_dir, monkeypatch):
+    table = dashboard.load_snapshot(PAYLOAD)
+    assert dashboard.load_snapshot("missing.json") is table
+    with pytest.raises(FileNotFoundError):
+        dashboard.load_snapshot("missing.json", force=True)
+    monkeypatch.setattr(dashboard, "SNAPSHOT_TTL_SECONDS", 0)
+    assert dashboard.load_snapshot(PAYLOAD) is not table
+
+def test_load_snapshot_from_stand_in(stand_in):
+    table = dashboard.load_snapshot()
+    assert table.loc["côte d'ivoire", "deaths"] == 835
+    assert stand_in.requests == ["/countries"]
+
+def test_latest_totals_by_name_or_code(data_dir):
+    dashboard.load_snapshot(PAYLOAD)
+    totals = dashboard.latest_totals(" India ")
+    assert totals["cases"] == 44690738
+    assert totals["continent"] == "Asia"
+    assert dashboard.latest_totals("IND") == totals
+    assert dashboard.latest_totals("de")["deaths"] == 168000
+    assert dashboard.latest_totals("atlantis") is None
+    assert dashboard.latest_totals("diamond princess")["population"] == 0
+
+def test_snapshot_ranking(data_dir):
+    dashboard.load_snapshot(PAYLOAD)
+    ranking = dashboard.snapshot_ranking("deaths", top=2)
+    assert list(ranking["country"]) == ["usa", "india"]
+    assert list(ranking["rank"]) == [1, 2]
+    with pytest.raises(ValueError):
+        dashboard.snapshot_ranking("flags")
+
+def test_snapshot_populations(data_dir):
+    dashboard.load_snapshot(PAYLOAD)
+    populations = dashboard.snapshot_populations()
+    assert populations["india"] == populations["ind"] == populations["in"] == 1406631776
+    assert "diamond princess" not in populations  # No known population
+
+def test_compare_per_capita_uses_snapshot_populations(data_dir, capsys):
+    for country in ("india", "germany", "atlantis"):
+        dashboard.write_country_frame(country, dashboard.timeline_to_frame(make_timeline(20)))
+    dashboard.load_snapshot(PAYLOAD)
+
+    assert covid_dash.main(["compare", "--country", "india", "--country", "germany", "--country", "atlantis",
+                            "--per-capita"]) == 0
+    out, err = capsys.readouterr()
+    rows = [line.split() for line in out.splitlines()[1:]]
+    assert [row[1] for row in rows] == ["germany", "india", "atlantis"]
+    assert float(rows[0][2]) == pytest.approx(190 / 83883596 * 100_000, rel=1e-4)
+    assert rows[2][2] == "NaN"
+    assert "No population for: atlantis" in err
+
+def test_compare_per_capita_without_populations_fails(data_dir, monkeypatch):
+    dashboard.write_country_frame("india", dashboard.timeline_to_frame(make_timeline(20)))
+    monkeypatch.setattr(dashboard, "API_BASE_URL", "http://127.0.0.1:9")
+    monkeypatch.setattr(dashboard, "MAX_RETRIES", 0)
+    with pytest.raises(SystemExit) as exit_info:
+        covid_dash.main(["compare", "--country", "india", "--per-capita"])
+    assert "--populations" in str(exit_info.value)
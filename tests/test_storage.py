@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+@pytest.fixture
+def stored_frame(data_dir):
+    frame = dashboard.timeline_to_frame(make_timeline(30, vaccinated=True))
+    frame.loc[3, 'deaths'] = pd.NA
+    return frame
+
+@pytest.mark.parametrize("storage_format", ["npy", "csv", "sqlite"])
+def test_round_trip_keeps_the_schema(stored_frame, storage_format, monkeypatch):
+    monkeypatch.setattr(dashboard, "STORAGE_FORMAT", storage_format)
+    dashboard.write_country_frame("india", stored_frame)
+    df = dashboard.read_country_frame("india")
+
+    assert list(df.columns) == ['date'] + dashboard.METRICS
+    assert str(df['date'].dtype) == "datetime64[s]"
+    assert str(df['cases'].dtype) == "uint16"
+    assert str(df['deaths'].dtype) == "UInt8"
+    assert df['deaths'].isna().sum() == 1
+    assert int(df['cases'].iloc[-1]) == 290
+
+@pytest.mark.parametrize("storage_format", ["npy", "csv", "sqlite"])
+def test_query_returns_the_same_types_in_every_format(stored_frame, storage_format, monkeypatch):
+    monkeypatch.setattr(dashboard, "STORAGE_FORMAT", storage_format)
+    dashboard.write_country_frame("india", stored_frame)
+    result = dashboard.query("india", "2023-02-10", "2023-02-20")
+
+    assert len(result) == 11
+    assert result['date'].dtype == "datetime64[s]"
+    for metric in dashboard.METRICS:
+        assert pd.api.types.is_unsigned_integer_dtype(result[metric].dtype)
+    assert result['cases'].tolist() == list(range(20, 130, 10))
+
+    # A missing day is <NA> in a nullable column, not None in an object column
+    missing_day = dashboard.query("india", "2023-02-11", "2023-02-11")
+    assert isinstance(missing_day['deaths'].dtype, pd.UInt8Dtype)
+    assert missing_day['deaths'].iloc[0] is pd.NA
+
+def test_query_rejects_unknown_metrics(data_dir):
+    with pytest.raises(ValueError):
+        dashboard.query("india", metrics=["flags"])
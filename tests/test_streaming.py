@@ -0,0 +1,44 @@
+import io
+import json
+
+import pytest
+
+import Final_Function_Improve_Project_COVID_19_Data_Dashboard as dashboard
+from conftest import make_timeline
+
+ELEMENTS = [{"country": "Côte d'Ivoire", "province": None, "values": [1, 2.5, -3e2]},
+            12345, "a string with ] and [ and \"quotes\"", [], {}, [[1], {"x": "]"}], True, None, 0]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 7, 16, 64, 4096])
+def test_iter_json_array_chunk_boundaries(chunk_size):
+    payload = json.dumps(ELEMENTS, ensure_ascii=False, indent=1).encode("utf-8")
+    assert list(dashboard.iter_json_array(io.BytesIO(payload), chunk_size)) == ELEMENTS
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 64])
+def test_iter_json_array_number_at_chunk_end(chunk_size):
+    # A number that fills the buffer exactly may still continue in the next chunk
+    assert list(dashboard.iter_json_array(io.BytesIO(b"[1234,56789]"), chunk_size)) == [1234, 56789]
+
+@pytest.mark.parametrize("payload", [b"[]", b"  [ ]  ", b"[\r\n]"])
+def test_iter_json_array_empty(payload):
+    assert list(dashboard.iter_json_array(io.BytesIO(payload), 1)) == []
+
+@pytest.mark.parametrize("payload", [b'{"country": "india"}', b"[1, 2", b'[{"country": "ind'])
+def test_iter_json_array_rejects_broken_payloads(payload):
+    with pytest.raises(ValueError):
+        list(dashboard.iter_json_array(io.BytesIO(payload), 3))
+
+def test_ingest_all_countries_from_file(data_dir):
+    payload = [{"country": "India", "province": None, "timeline": make_timeline(20)},
+               {"country": "Canada", "province": "ontario", "timeline": make_timeline(20)},
+               {"country": "USA", "province": None, "timeline": make_timeline(10, vaccinated=True)},
+               {"country": "Canada", "province": "quebec", "timeline": make_timeline(20)}]
+    source = data_dir / "all_countries.json"
+    source.write_text(json.dumps(payload))
+
+    report = dashboard.ingest_all_countries(str(source))
+
+    assert report == {"india": 20, "canada": 20, "usa": 10}
+    canada = dashboard.read_country_frame("canada")
+    assert int(canada['cases'].iloc[-1]) == 2 * 190  # Both provinces added up
+    assert int(dashboard.read_country_frame("usa")['vaccinations'].iloc[-1]) == 27